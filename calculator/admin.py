@@ -1,5 +1,17 @@
-from django.contrib import admin
-from .models import SolarPanel, Region, Calculation
+import csv
+import itertools
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
+from .models import SolarPanel, Region, Calculation, Job
+from .services.jobs import enqueue
+from .services.table_stats import estimate_row_count
+
+# Размер пакета для массовых действий над расчётами
+ACTION_BATCH_SIZE = 2000
 
 @admin.register(SolarPanel)
 class SolarPanelAdmin(admin.ModelAdmin):
@@ -17,14 +29,46 @@ class RegionAdmin(admin.ModelAdmin):
     ordering = ['name']
     list_per_page = 20
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц: без фильтров берёт оценку числа строк
+    из статистики СУБД вместо COUNT(*) по всей таблице.
+    """
+
+    # Ниже этого порога точный COUNT(*) дешёвый — считаем честно
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list
+        if isinstance(object_list, QuerySet) and not object_list.query.where:
+            estimate = estimate_row_count(object_list.model)
+            if estimate is not None and estimate > self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи (для потоковой выгрузки)."""
+
+    def write(self, value):
+        return value
+
+
 @admin.register(Calculation)
 class CalculationAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'region', 'panel', 'panel_count', 'total_cost', 'payback_years', 'created_at']
     list_filter = ['region', 'created_at']
     search_fields = ['user__username', 'region__name', 'panel__name']
     readonly_fields = ['created_at', 'updated_at']
-    date_hierarchy = 'created_at'
     list_per_page = 20
+    # Пользователь, регион и панель — одним JOIN вместо запроса на каждую строку
+    list_select_related = ['user', 'region', 'panel']
+    # Без date_hierarchy: он строит список дат по всей таблице; фильтр по created_at
+    # (индекс) даёт те же диапазоны без полного сканирования
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['recompute_results', 'export_csv']
 
     fieldsets = (
         ('Параметры расчета', {
@@ -37,4 +81,42 @@ class CalculationAdmin(admin.ModelAdmin):
         ('Даты', {
             'fields': ('created_at', 'updated_at')
         })
-    )
\ No newline at end of file
+    )
+
+    @admin.action(description='Пересчитать результаты (в фоне)')
+    def recompute_results(self, request, queryset):
+        if request.POST.get('select_across') != '1':
+            params = {'ids': list(queryset.values_list('pk', flat=True))}
+        else:
+            # «Выбрать все» — передаём фильтры и поиск списка, а не миллионы id
+            changelist = self.get_changelist_instance(request)
+            params = {
+                'filters': {lookup: value[-1] if isinstance(value, list) else value
+                            for lookup, value in changelist.get_filters_params().items()},
+                'search': changelist.query,
+            }
+        job = enqueue('recompute_calculations', params, user=request.user)
+        self.message_user(request, f"Пересчёт поставлен в очередь (задача {job.pk})", messages.SUCCESS)
+
+    @admin.action(description='Выгрузить в CSV')
+    def export_csv(self, request, queryset):
+        fields = ['id', 'user__username', 'region__code', 'panel__name', 'panel_count', 'monthly_consumption',
+                  'total_cost', 'yearly_production_kwh', 'yearly_saving', 'payback_years', 'created_at']
+        rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=ACTION_BATCH_SIZE)
+
+        writer = csv.writer(Echo())
+        lines = itertools.chain([writer.writerow(fields)], (writer.writerow(row) for row in rows))
+
+        response = StreamingHttpResponse(lines, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="calculations.csv"'
+        return response
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'user', 'worker', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['id', 'kind', 'user__username']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+    list_select_related = ['user']
+    list_per_page = 20
@@ -0,0 +1,59 @@
+import math
+
+from .forms import CalculationApiForm
+from .services.calculator import SolarROICalculator
+
+# Стоимость элемента API в токенах контроля допуска: 1 — обычный расчёт (~10 мс CPU).
+# Monte Carlo — токен на каждые MONTE_CARLO_DRAWS_PER_TOKEN лет симуляции,
+# почасовой подбор аккумулятора и анализ чувствительности — фиксированная надбавка
+MONTE_CARLO_DRAWS_PER_TOKEN = 2000
+BATTERY_COST = 8
+SENSITIVITY_COST = 1
+
+
+def item_cost(payload):
+    """Оценка стоимости элемента до валидации (некорректный элемент стоит 1)."""
+    if not isinstance(payload, dict):
+        return 1
+    cost = 1
+    try:
+        cost += math.ceil(max(0, int(payload.get('monte_carlo_draws') or 0)) / MONTE_CARLO_DRAWS_PER_TOKEN)
+    except (TypeError, ValueError):
+        pass
+    if payload.get('battery'):
+        cost += BATTERY_COST
+    if payload.get('sensitivity'):
+        cost += SENSITIVITY_COST
+    return cost
+
+
+def calculate_api_item(payload):
+    """Валидирует один элемент запроса API и возвращает (результат, ошибки)."""
+    if not isinstance(payload, dict):
+        return None, {'__all__': ['Ожидается JSON-объект']}
+
+    form = CalculationApiForm(payload)
+    if not form.is_valid():
+        return None, {
+            field: [error['message'] for error in errors]
+            for field, errors in form.errors.get_json_data().items()
+        }
+
+    options = form.cleaned_data
+    calculator = SolarROICalculator(
+        panel=options['panel'],
+        panel_count=options['panel_count'],
+        region=options['region'],
+        monthly_consumption=options['monthly_consumption']
+    )
+    return calculator.calculate_report(
+        monte_carlo_draws=options.get('monte_carlo_draws'),
+        tariff_sigma=options.get('tariff_sigma'),
+        price_sigma=options.get('price_sigma'),
+        sensitivity=options.get('sensitivity'),
+        sensitivity_range=options.get('sensitivity_range'),
+        battery=options.get('battery'),
+        battery_max_kwh=options.get('battery_max_kwh'),
+        battery_step_kwh=options.get('battery_step_kwh'),
+        battery_price_per_kwh=options.get('battery_price_per_kwh'),
+    ), None
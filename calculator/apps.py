@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class CalculatorConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'calculator'
+
+    def ready(self):
+        # Подключаем обработчики сигналов (инвалидация кеша каталога)
+        from . import signals  # noqa: F401
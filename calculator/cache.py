@@ -0,0 +1,42 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (локальная разработка): без межпроцессной блокировки, как у FileBasedCache
+    fcntl = None
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class LockedFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache, у которого add и incr атомарны для всех процессов узла.
+
+    У FileBasedCache add — это проверка и запись отдельными шагами, и два
+    процесса могли занять один слот этапа. Здесь они выполняются под flock
+    служебного файла в каталоге кеша.
+    """
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self._dir, exist_ok=True)
+        with open(os.path.join(self._dir, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            return super().incr(key, delta, version)
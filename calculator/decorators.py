@@ -0,0 +1,55 @@
+from functools import wraps
+
+from django.http import HttpResponse, JsonResponse
+
+from .services.admission import AdmissionRejected, bucket_size, client_id, fail_fast, take_token
+
+
+def _too_many_requests(reason, retry_after, as_json):
+    if as_json:
+        response = JsonResponse({'errors': {'__all__': [reason]}}, status=429,
+                                json_dumps_params={'ensure_ascii': False})
+    else:
+        response = HttpResponse(f"{reason}. Повторите через {retry_after} с.", status=429,
+                                content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def admission_control(scope, methods=('POST',), as_json=True, cost=None, too_heavy_hint=''):
+    """
+    Контроль допуска для тяжёлых view: корзина токенов клиента и лимит дорогих этапов.
+
+    Запросы с методами из methods берут из корзины области scope cost(request)
+    токенов (по умолчанию один); при пустой корзине или занятых этапах сразу
+    отвечаем 429 с Retry-After. Запрос дороже всей корзины не пройдёт никогда —
+    ему отвечаем 413 с подсказкой too_heavy_hint.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return view(request, *args, **kwargs)
+
+            client = client_id(request)
+            tokens = cost(request) if cost else 1
+            burst = bucket_size(scope, client)
+            if burst is not None and tokens > burst:
+                reason = f"Запрос слишком тяжёлый: {tokens} ед. при лимите {burst}. {too_heavy_hint}".strip()
+                if as_json:
+                    return JsonResponse({'errors': {'__all__': [reason]}}, status=413,
+                                        json_dumps_params={'ensure_ascii': False})
+                return HttpResponse(reason, status=413, content_type='text/plain; charset=utf-8')
+
+            retry_after = take_token(scope, client, cost=tokens)
+            if retry_after:
+                rejected = AdmissionRejected("Слишком много запросов", retry_after)
+                return _too_many_requests(rejected.reason, rejected.retry_after, as_json)
+
+            try:
+                with fail_fast():
+                    return view(request, *args, **kwargs)
+            except AdmissionRejected as e:
+                return _too_many_requests(e.reason, e.retry_after, as_json)
+        return wrapper
+    return decorator
@@ -1,19 +1,70 @@
 from django import forms
+from django.forms.models import ModelChoiceIterator
 from .models import Region, SolarPanel
+from .services.catalog import catalog_cache
+
+
+class CatalogChoiceIterator(ModelChoiceIterator):
+    """Итератор вариантов выбора, читающий объекты из кеша каталога, а не из БД."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.catalog_items():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.catalog_items()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.catalog_items())
+
+
+class CatalogChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField, который при отрисовке и валидации не делает запросов к каталогу."""
+
+    iterator = CatalogChoiceIterator
+
+    def __init__(self, queryset, catalog_items, catalog_lookup, **kwargs):
+        self.catalog_items = catalog_items
+        self.catalog_lookup = catalog_lookup
+        super().__init__(queryset, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        self.validate_no_null_characters(value)
+        try:
+            if isinstance(value, self.queryset.model):
+                value = value.pk
+            obj = self.catalog_lookup(int(value))
+        except (ValueError, TypeError):
+            obj = None
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
 
 
 class SolarCalculationForm(forms.Form):
     """Форма для ввода данных расчёта окупаемости."""
 
-    region = forms.ModelChoiceField(
+    region = CatalogChoiceField(
         queryset=Region.objects.all(),
+        catalog_items=catalog_cache.regions,
+        catalog_lookup=catalog_cache.get_region,
         label="Выберите ваш регион",
         widget=forms.Select(attrs={'class': 'form-control'}),
         empty_label="--- Выберите регион ---"
     )
 
-    panel = forms.ModelChoiceField(
+    panel = CatalogChoiceField(
         queryset=SolarPanel.objects.all(),
+        catalog_items=catalog_cache.panels,
+        catalog_lookup=catalog_cache.get_panel,
         label="Выберите модель солнечной панели",
         widget=forms.Select(attrs={'class': 'form-control'}),
         empty_label="--- Выберите панель ---"
@@ -43,6 +94,13 @@ class SolarCalculationForm(forms.Form):
         help_text="Обычно от 150 до 800 кВт*ч/месяц для частного дома"
     )
 
+    battery = forms.BooleanField(
+        label="Рассчитать аккумулятор",
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        help_text="Подбор ёмкости накопителя с учётом дневного и ночного тарифа"
+    )
+
     def clean_panel_count(self):
         """Валидация количества панелей."""
         count = self.cleaned_data['panel_count']
@@ -59,6 +117,41 @@ class SolarCalculationForm(forms.Form):
 
 
 
+class CalculationApiForm(SolarCalculationForm):
+    """Схема запроса JSON API: регион по коду, панель по id, остальные поля как в основной форме."""
+
+    region = forms.CharField(max_length=10)
+    panel = forms.IntegerField(min_value=1)
+
+    # Необязательный режим Monte Carlo (P50/P90)
+    monte_carlo_draws = forms.IntegerField(required=False, min_value=100, max_value=100000)
+    tariff_sigma = forms.FloatField(required=False, min_value=0, max_value=0.5)
+    price_sigma = forms.FloatField(required=False, min_value=0, max_value=0.5)
+
+    # Необязательный анализ чувствительности (tornado): ±sensitivity_range от базовых значений
+    sensitivity = forms.BooleanField(required=False)
+    sensitivity_range = forms.FloatField(required=False, min_value=0.01, max_value=0.5)
+
+    # Необязательный подбор аккумулятора: ёмкости 0..battery_max_kwh с шагом battery_step_kwh
+    battery_max_kwh = forms.FloatField(required=False, min_value=1, max_value=100)
+    battery_step_kwh = forms.FloatField(required=False, min_value=0.5, max_value=10)
+    battery_price_per_kwh = forms.FloatField(required=False, min_value=0)
+
+    def clean_region(self):
+        code = self.cleaned_data['region']
+        region = catalog_cache.get_region_by_code(code)
+        if region is None:
+            raise forms.ValidationError(f"Неизвестный код региона: {code}")
+        return region
+
+    def clean_panel(self):
+        panel_id = self.cleaned_data['panel']
+        panel = catalog_cache.get_panel(panel_id)
+        if panel is None:
+            raise forms.ValidationError(f"Неизвестная панель: {panel_id}")
+        return panel
+
+
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from calculator.services.archive import archive_calculations
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые расчёты в архив с помесячными агрегатами для статистики'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            default=getattr(settings, 'CALCULATION_RETENTION_DAYS', 365),
+                            help='Архивировать расчёты старше N дней')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Строк в одной транзакции')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, сколько строк будет перенесено')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        self.stdout.write(f"Архивируем расчёты старше {cutoff:%d.%m.%Y}...")
+
+        report = archive_calculations(cutoff, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        total = sum(report.values())
+        verb = 'Будет перенесено' if options['dry_run'] else 'Перенесено в архив'
+        self.stdout.write(self.style.SUCCESS(f"{verb}: {total} расчётов за {len(report)} мес."))
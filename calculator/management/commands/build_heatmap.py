@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from calculator.services.heatmap import build_heatmap
+
+
+class Command(BaseCommand):
+    help = ('Строит тайлы карты окупаемости эталонной системы по сетке широт и долгот '
+            '(инсоляция интерполируется по архивам и климатологии NASA, fallback — где данных нет)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--allow-fallback', action='store_true',
+                            help='Строить карту, даже если большая часть узлов без данных NASA')
+
+    def handle(self, *args, **options):
+        try:
+            meta = build_heatmap(allow_fallback=options['allow_fallback'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(meta, ensure_ascii=False, indent=2))
+        if meta['sources']['fallback']:
+            self.stdout.write(self.style.WARNING(
+                f"Узлов без данных NASA (fallback-модель): {meta['sources']['fallback']} "
+                f"({meta['fallback_share']:.0%})"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Карта {meta['rows']}x{meta['cols']} построена за {meta['build_seconds']} с"
+        ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from calculator.models import Region
+from calculator.services.climatology import ClimatologyStore
+from calculator.services.heatmap import heatmap_settings
+
+
+class Command(BaseCommand):
+    help = 'Загружает/докачивает многолетний архив NASA POWER для всех регионов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=10, help='Сколько последних полных лет хранить')
+        parser.add_argument('--workers', type=int, default=4, help='Параллельных загрузок на точку')
+        parser.add_argument('--region', action='append', dest='regions', help='Код региона (можно несколько)')
+        parser.add_argument('--grid', action='store_true',
+                            help='Региональная климатология по области карты окупаемости (HEATMAP) вместо регионов')
+
+    def handle(self, *args, **options):
+        store = ClimatologyStore(max_workers=options['workers'])
+        if options['grid']:
+            self._fetch_grid(store)
+            return
+
+        regions = Region.objects.exclude(latitude=None).exclude(longitude=None)
+        if options['regions']:
+            regions = regions.filter(code__in=options['regions'])
+
+        total_fetched = 0
+        for region in regions:
+            result = store.update(region.latitude, region.longitude, years=options['years'])
+            total_fetched += result['fetched']
+
+            if result['errors']:
+                for error in result['errors']:
+                    self.stdout.write(self.style.WARNING(f"{region.name}: {error}"))
+            self.stdout.write(f"{region.name}: загружено лет — {result['fetched']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Готово, загружено лет: {total_fetched}"))
+
+    def _fetch_grid(self, store):
+        config = heatmap_settings()
+        result = store.update_regional(config['LAT_RANGE'], config['LON_RANGE'])
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово, загружено прямоугольников: {result['fetched']}, точек климатологии: {result['points']}"
+        ))
@@ -0,0 +1,129 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from calculator.services.api_client import EnergyDataClient
+from calculator.services.catalog import catalog_cache
+from calculator.services.loadtest import DEFAULT_MIX, run_load_test, summarize, target_catalog
+from calculator.services.stub_servers import StubServer, nasa_power_handler
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест: стаб NASA POWER + смесь запросов (главная, расчёт, история, вход). '
+            'Без --target приложение запускается в этом же процессе; для планирования мощностей '
+            'лучше указать --target боевого сервера с NASA_API_URL, направленным на стаб '
+            '(адрес стаба фиксируется через --nasa-host/--nasa-port).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='URL тестируемого сервера (по умолчанию — встроенный, без '
+                                             'контроля допуска). Все пользователи теста входят под одним '
+                                             '--username, поэтому на цели отключите ADMISSION или поднимите RATES')
+        parser.add_argument('--concurrency', type=int, default=10, help='Виртуальных пользователей')
+        parser.add_argument('--duration', type=float, default=30, help='Длительность, с')
+        parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                            help='Доли запросов, например home=30,calculate=30,history=10')
+        parser.add_argument('--nasa-latency', type=float, default=0.2, help='Задержка стаба NASA, с')
+        parser.add_argument('--nasa-error-rate', type=float, default=0.0, help='Доля ошибок стаба NASA (0..1)')
+        parser.add_argument('--nasa-host', default='127.0.0.1',
+                            help='Адрес стаба NASA (0.0.0.0 — если цель на другой машине)')
+        parser.add_argument('--nasa-port', type=int, default=0,
+                            help='Порт стаба NASA (0 — свободный); с --target укажите порт из NASA_API_URL цели')
+        parser.add_argument('--username', default='testUser')
+        parser.add_argument('--password', default='testpass123')
+        parser.add_argument('--output', help='Записать JSON-отчёт в файл')
+
+    def _parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            if name.strip() not in DEFAULT_MIX:
+                raise CommandError(f"Неизвестный тип запроса в --mix: {name}")
+            mix[name.strip()] = float(weight or 1)
+        return mix
+
+    def handle(self, *args, **options):
+        # stdout — только для JSON-отчёта (loadtest | jq). print() приложения (каталог,
+        # калькулятор, клиент NASA во встроенном сервере) уходит в stderr при --verbosity 2,
+        # иначе отбрасывается; self.stdout держит исходный поток и перенаправление не задевает
+        with contextlib.ExitStack() as stack:
+            app_output = sys.stderr if options['verbosity'] > 1 else stack.enter_context(open(os.devnull, 'w'))
+            stack.enter_context(contextlib.redirect_stdout(app_output))
+            if not options['target']:
+                # Все виртуальные пользователи входят под одним --username и делят одну
+                # корзину токенов — с контролем допуска тест мерил бы лимитер, а не приложение
+                stack.enter_context(override_settings(ADMISSION=dict(getattr(settings, 'ADMISSION', {}), ENABLED=False)))
+            report = self._run(options)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def _run(self, options):
+        mix = self._parse_mix(options['mix'])
+
+        if options['target']:
+            # Расчёты должны ссылаться на каталог цели, а не на локальную БД
+            try:
+                region_ids, panel_ids = target_catalog(options['target'])
+            except requests.exceptions.RequestException as e:
+                raise CommandError(f"Не удалось прочитать каталог цели: {e}")
+        else:
+            region_ids = [region.pk for region in catalog_cache.regions()]
+            panel_ids = [panel.pk for panel in catalog_cache.panels()]
+        if not region_ids or not panel_ids:
+            raise CommandError("Каталог пуст — сначала выполните manage.py seed_data")
+
+        try:
+            nasa_stub = StubServer(nasa_power_handler, latency=options['nasa_latency'],
+                                   error_rate=options['nasa_error_rate'],
+                                   host=options['nasa_host'], port=options['nasa_port']).start()
+        except OSError as e:
+            raise CommandError(f"Не удалось поднять стаб NASA на {options['nasa_host']}:{options['nasa_port']}: {e}")
+        nasa_url = f"{nasa_stub.url}/api/temporal/daily/point"
+        self.stderr.write(f"Стаб NASA POWER: {nasa_url}")
+
+        server = None
+        base_url = options['target']
+        if not base_url:
+            # Встроенный сервер использует стаб через атрибут класса клиента
+            EnergyDataClient.NASA_API_URL = nasa_url
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        self.stderr.write(f"Цель: {base_url}, пользователей: {options['concurrency']}, {options['duration']} с")
+
+        try:
+            samples, elapsed = run_load_test(
+                base_url, options['concurrency'], options['duration'], mix,
+                options['username'], options['password'], region_ids, panel_ids,
+            )
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            nasa_stub.stop()
+
+        report = summarize(samples, elapsed)
+        report.update({
+            'target': base_url,
+            'concurrency': options['concurrency'],
+            'mix': mix,
+            'nasa_stub': {'latency_s': options['nasa_latency'], 'error_rate': options['nasa_error_rate']},
+        })
+        return report
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from calculator.models import Region
+from calculator.services.recompute import recompute_for_catalog_change
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает стоимость, экономию и окупаемость сохранённых расчётов по текущим '
+            'тарифам и ценам (обычно ставится в очередь автоматически при изменении каталога)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--region', action='append', default=[], help='Код региона (можно несколько)')
+        parser.add_argument('--panel', action='append', type=int, default=[], help='Id панели (можно несколько)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Строк в одном пакете')
+
+    def handle(self, *args, **options):
+        region_ids = list(Region.objects.filter(code__in=options['region']).values_list('pk', flat=True))
+        if len(region_ids) != len(set(options['region'])):
+            raise CommandError("Не все коды регионов найдены")
+        if not region_ids and not options['panel']:
+            raise CommandError("Укажите --region и/или --panel")
+
+        started = time.perf_counter()
+        report = recompute_for_catalog_change(region_ids, options['panel'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Проверено {report['checked']}, обновлено {report['updated']} расчётов "
+            f"за {time.perf_counter() - started:.1f} с"
+        ))
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from calculator.services.jobs import (
+    claim_next, fail_job, requeue_job, requeue_stale, run_job, setup_worker_process,
+)
+
+
+def _make_pool(processes):
+    # spawn: дочерние процессы не наследуют открытые соединения с БД родителя
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=setup_worker_process,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркер фоновых задач (очередь в БД, пул процессов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 2, help='Размер пула процессов')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Пауза опроса пустой очереди, с')
+        parser.add_argument('--burst', action='store_true', help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        stale_seconds = getattr(settings, 'JOB_STALE_SECONDS', 60 * 60)
+        stale_check = getattr(settings, 'JOB_STALE_CHECK_SECONDS', 60)
+
+        self._requeue_stale(stale_seconds, worker)
+        next_stale_check = time.monotonic() + stale_check
+
+        self.stdout.write(f"Воркер {worker}: {processes} процессов")
+
+        pool = _make_pool(processes)
+        running = {}
+        try:
+            while True:
+                broken = False
+                for job_id, future in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[job_id]
+                    error = future.exception()
+                    if error is None:
+                        self.stdout.write(f"Задача {job_id}: {future.result()}")
+                        continue
+                    # run_job сам записывает ошибки обработчика; сюда попадает
+                    # аварийное завершение процесса пула — задача так и осталась бы running
+                    broken = broken or isinstance(error, BrokenProcessPool)
+                    fail_job(job_id, f"Процесс пула завершился аварийно: {error!r}")
+                    self.stdout.write(self.style.ERROR(f"Задача {job_id}: failed ({error!r})"))
+
+                if broken:
+                    # Остальные задачи сломанного пула уже получили BrokenProcessPool выше
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = _make_pool(processes)
+                    self.stdout.write(self.style.WARNING("Пул процессов пересоздан"))
+
+                if time.monotonic() >= next_stale_check:
+                    self._requeue_stale(stale_seconds, worker)
+                    next_stale_check = time.monotonic() + stale_check
+
+                job_id = claim_next(worker) if len(running) < processes else None
+                if job_id is not None:
+                    try:
+                        running[job_id] = pool.submit(run_job, job_id)
+                    except BrokenProcessPool:
+                        requeue_job(job_id)
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = _make_pool(processes)
+                        self.stdout.write(self.style.WARNING("Пул процессов пересоздан"))
+                    continue
+
+                if options['burst'] and not running:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Остановка воркера, ждём выполняющиеся задачи...")
+        finally:
+            pool.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS("Воркер остановлен"))
+
+    def _requeue_stale(self, stale_seconds, worker):
+        requeued = requeue_stale(stale_seconds, exclude_worker=worker)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Возвращено в очередь зависших задач: {requeued}"))
@@ -1,12 +1,28 @@
+import time
+
+import numpy as np
 from django.core.management.base import BaseCommand
 from calculator.models import SolarPanel, Region
+from calculator.services import synthetic
+from calculator.services.catalog import catalog_cache
 from django.contrib.auth.models import User
 
 
 class Command(BaseCommand):
-    help = 'Заполняет базу данных тестовыми данными'
+    help = ('Заполняет базу данных тестовыми данными. С --scale дополнительно генерирует '
+            'большой синтетический каталог и миллионы расчётов для нагрузочных проверок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', action='store_true', help='Сгенерировать синтетические данные большого объёма')
+        parser.add_argument('--regions', type=int, default=1000, help='Синтетических регионов (всего)')
+        parser.add_argument('--panels', type=int, default=10000, help='Синтетических панелей (всего)')
+        parser.add_argument('--users', type=int, default=5000, help='Синтетических пользователей (всего)')
+        parser.add_argument('--calculations', type=int, default=1000000, help='Добавить столько расчётов')
+        parser.add_argument('--days', type=int, default=730, help='Период дат расчётов, дней назад')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Строк в одном bulk_create')
+        parser.add_argument('--seed', type=int, help='Seed генератора (для воспроизводимости)')
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
         self.stdout.write("Начинаем заполнение базы тестовыми данными...")
 
         user, created = User.objects.get_or_create(
@@ -88,4 +104,31 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f"Успешно создано: {len(regions)} регионов, {len(panels)} панелей"))
         self.stdout.write("Админка доступна по адресу: http://127.0.0.1:8000/admin или localhost:8000/admin")
-        self.stdout.write("Логин: Imperator / Пароль: неправильный пароль")
\ No newline at end of file
+        self.stdout.write("Логин: Imperator / Пароль: неправильный пароль")
+
+        if options['scale']:
+            self._seed_scale(options)
+
+    def _seed_scale(self, options):
+        rng = np.random.default_rng(options['seed'])
+        batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        regions = synthetic.generate_regions(options['regions'], rng)
+        panels = synthetic.generate_panels(options['panels'], rng)
+        users = synthetic.generate_users(options['users'])
+        # bulk_create не отправляет post_save — сбрасываем кэш каталога вручную
+        catalog_cache.invalidate()
+        self.stdout.write(f"Синтетический каталог: +{regions} регионов, +{panels} панелей, +{users} пользователей")
+
+        def progress(done, total):
+            rate = done / (time.perf_counter() - started)
+            self.stdout.write(f"  расчётов: {done}/{total} ({rate:.0f} строк/с)")
+
+        created = synthetic.generate_calculations(
+            options['calculations'], rng, days=options['days'], batch_size=batch_size,
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано {created} расчётов за {time.perf_counter() - started:.1f} с"
+        ))
\ No newline at end of file
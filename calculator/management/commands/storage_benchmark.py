@@ -0,0 +1,56 @@
+import json
+import os
+import time
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from calculator.models import ArchivedCalculation, Calculation, CalculationRollup, UserCalculationRollup
+from calculator.services.statistics import site_statistics, user_statistics
+
+
+class Command(BaseCommand):
+    help = 'Замеряет размер «горячей» таблицы и время запросов статистики (JSON для сравнения до/после архивации)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Повторов каждого замера')
+
+    def _timed(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return round(median(timings), 3)
+
+    def _history_page(self, user_id):
+        list(Calculation.objects.filter(user_id=user_id).select_related('region', 'panel')
+             .order_by('-created_at')[:50])
+        user_statistics(user_id)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+
+        # Самый активный пользователь — худший случай для страницы истории
+        busiest = (Calculation.objects.exclude(user=None).values('user')
+                   .annotate(n=Count('pk')).order_by('-n').first())
+
+        report = {
+            'hot_rows': Calculation.objects.count(),
+            'archived_rows': ArchivedCalculation.objects.count(),
+            'rollup_rows': CalculationRollup.objects.count(),
+            'user_rollup_rows': UserCalculationRollup.objects.count(),
+            'home_stats_ms': self._timed(site_statistics, repeat),
+            'history_ms': self._timed(lambda: self._history_page(busiest['user']), repeat) if busiest else None,
+        }
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                report['journal_mode'] = cursor.fetchone()[0]
+            db_name = settings.DATABASES['default']['NAME']
+            report['db_size_bytes'] = os.path.getsize(db_name) if os.path.exists(db_name) else None
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False))
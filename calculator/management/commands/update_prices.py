@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from calculator.models import SolarPanel
+from calculator.services.stub_servers import StubServer
+from calculator.services.suppliers import SupplierPriceAggregator
+
+
+class Command(BaseCommand):
+    help = 'Обновляет цены панелей по данным API поставщиков (медиана по ответившим)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deadline', type=float, default=None, help='Общий дедлайн опроса, с')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, сколько цен изменится, без записи в БД')
+        parser.add_argument('--stub', action='store_true',
+                            help='Проверить конвейер на локальных стабах поставщиков (всегда без записи в БД)')
+
+    def handle(self, *args, **options):
+        if options['stub']:
+            self._run_with_stubs(options['deadline'] or 1.0)
+        else:
+            aggregator = SupplierPriceAggregator(deadline=options['deadline'])
+            self._report(aggregator.update_panel_prices(dry_run=options['dry_run']))
+
+    def _run_with_stubs(self, deadline):
+        """
+        Три стаба с разбросом цен ±5% и один «зависший» поставщик, который не успевает к дедлайну.
+
+        Цены в БД не меняются (dry_run). Проверяется, что зависший поставщик
+        отсечён дедлайном, а результат собран по остальным (частичный ответ).
+        """
+        catalog = list(SolarPanel.objects.values_list('name', 'price'))
+
+        def price_list(factor):
+            def handler(path, query):
+                return 200, {'prices': [{'name': name, 'price': float(price) * factor} for name, price in catalog]}
+            return handler
+
+        stubs = [
+            StubServer(price_list(0.95)),
+            StubServer(price_list(1.0), latency=0.1),
+            StubServer(price_list(1.05), error_rate=0.5),
+            StubServer(price_list(0.5), latency=deadline * 3),
+        ]
+        for stub in stubs:
+            stub.start()
+        try:
+            suppliers = [{'name': f'stub-{i}', 'url': f'{stub.url}/prices', 'timeout': deadline * 3}
+                         for i, stub in enumerate(stubs)]
+            aggregator = SupplierPriceAggregator(suppliers=suppliers, deadline=deadline, cache_seconds=0)
+            result = aggregator.update_panel_prices(dry_run=True)
+        finally:
+            for stub in stubs:
+                stub.stop()
+
+        self._report(result)
+        if 'stub-3' not in result['errors']:
+            raise CommandError("Зависший поставщик stub-3 не отсечён дедлайном")
+        if catalog and result['matched'] != len({name for name, _ in catalog}):
+            raise CommandError("Частичный результат не собран: найдены не все панели")
+        self.stdout.write(self.style.SUCCESS("Проверка на стабах пройдена (цены в БД не изменены)"))
+
+    def _report(self, result):
+        for supplier, error in result['errors'].items():
+            self.stdout.write(self.style.WARNING(f"{supplier}: {error}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Найдено панелей: {result['matched']}, изменится цен: {result.get('would_change', 0)}, "
+            f"обновлено: {result['updated']}"
+        ))
@@ -0,0 +1,61 @@
+import random
+import threading
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .services.profiling import QueryRecorder, StackSampler, profiling_settings, save_profile
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование выборки запросов (включается настройкой PROFILING['ENABLED']).
+
+    Профилируется доля SAMPLE_RATE случайных запросов, а также любой запрос
+    персонала с заголовком PROFILING['HEADER']. Для каждого сохраняются стеки
+    в формате folded (для flamegraph) и число/время SQL-запросов.
+    Должен стоять после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.config = profiling_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + self.config['HEADER'].upper().replace('-', '_')
+
+    def _should_profile(self, request):
+        user = getattr(request, 'user', None)
+        if request.META.get(self.header) and user is not None and user.is_staff:
+            return True
+        return random.random() < self.config['SAMPLE_RATE']
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), self.config['INTERVAL']).start()
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            sampler.stop()
+
+        user = getattr(request, 'user', None)
+        meta = {
+            'method': request.method,
+            'path': request.get_full_path()[:300],
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'samples': sum(sampler.counts.values()),
+            'user': user.get_username() if user is not None and user.is_authenticated else None,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            **recorder.summary(),
+        }
+        profile_id = save_profile(meta, sampler.folded())
+        response['X-Profile-Id'] = profile_id
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0002_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calculation',
+            index=models.Index(fields=['created_at'], name='calculator__created_0c5e9d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calculation',
+            index=models.Index(fields=['region', 'created_at'], name='calculator__region__819014_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0003_calculation_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCalculation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('period', models.DateField(db_index=True)),
+                ('panel_count', models.SmallIntegerField()),
+                ('monthly_consumption', models.FloatField()),
+                ('total_cost', models.FloatField(null=True)),
+                ('yearly_production_kwh', models.FloatField(null=True)),
+                ('yearly_saving', models.FloatField(null=True)),
+                ('payback_years', models.FloatField(null=True)),
+                ('co2_saved_kg', models.FloatField(null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Архивный расчет',
+                'verbose_name_plural': 'Архивные расчеты',
+            },
+        ),
+        migrations.CreateModel(
+            name='CalculationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('calculations', models.IntegerField(default=0)),
+                ('payback_count', models.IntegerField(default=0, help_text='Расчётов с заполненным сроком окупаемости')),
+                ('payback_sum', models.FloatField(default=0)),
+                ('co2_saved_sum', models.FloatField(default=0)),
+                ('total_cost_sum', models.FloatField(default=0)),
+                ('yearly_saving_sum', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Агрегат архива',
+                'verbose_name_plural': 'Агрегаты архива',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='calculation',
+            index=models.Index(fields=['user', 'created_at'], name='calculator__user_id_0cd1f7_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedcalculation',
+            name='panel',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='calculator.solarpanel'),
+        ),
+        migrations.AddField(
+            model_name='archivedcalculation',
+            name='region',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='calculator.region'),
+        ),
+        migrations.AddField(
+            model_name='archivedcalculation',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='calculationrollup',
+            name='panel',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='calculator.solarpanel'),
+        ),
+        migrations.AddField(
+            model_name='calculationrollup',
+            name='region',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='calculator.region'),
+        ),
+        migrations.AddField(
+            model_name='calculationrollup',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='calculationrollup',
+            index=models.Index(fields=['period', 'region', 'panel'], name='calculator__period_976cac_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+SUM_FIELDS = ['calculations', 'payback_count', 'payback_sum', 'co2_saved_sum',
+              'total_cost_sum', 'yearly_saving_sum']
+
+
+def split_rollups(apps, schema_editor):
+    """Агрегаты месяц x пользователь x регион x панель -> по пользователю и сжатые по каталогу."""
+    CalculationRollup = apps.get_model('calculator', 'CalculationRollup')
+    UserCalculationRollup = apps.get_model('calculator', 'UserCalculationRollup')
+    sums = {field: Sum(field) for field in SUM_FIELDS}
+
+    UserCalculationRollup.objects.bulk_create(
+        UserCalculationRollup(**row)
+        for row in CalculationRollup.objects.exclude(user=None).values('period', 'user_id')
+        .annotate(**sums).order_by()
+    )
+    catalog = list(CalculationRollup.objects.values('period', 'region_id', 'panel_id').annotate(**sums).order_by())
+    CalculationRollup.objects.all().delete()
+    CalculationRollup.objects.bulk_create(CalculationRollup(**row) for row in catalog)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0005_catalog_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCalculationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calculations', models.IntegerField(default=0)),
+                ('payback_count', models.IntegerField(default=0, help_text='Расчётов с заполненным сроком окупаемости')),
+                ('payback_sum', models.FloatField(default=0)),
+                ('co2_saved_sum', models.FloatField(default=0)),
+                ('total_cost_sum', models.FloatField(default=0)),
+                ('yearly_saving_sum', models.FloatField(default=0)),
+                ('period', models.DateField()),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Агрегат архива по пользователю',
+                'verbose_name_plural': 'Агрегаты архива по пользователям',
+                'indexes': [models.Index(fields=['user', 'period'], name='calculator__user_id_9fb0cb_idx')],
+            },
+        ),
+        migrations.RunPython(split_rollups, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='calculationrollup',
+            name='user',
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:03
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+SUM_FIELDS = ['calculations', 'payback_count', 'payback_sum', 'co2_saved_sum',
+              'total_cost_sum', 'yearly_saving_sum']
+
+
+def collapse_regions(apps, schema_editor):
+    """Складывает строки бывших регионов: агрегаты месяц x регион x панель -> месяц x панель."""
+    CalculationRollup = apps.get_model('calculator', 'CalculationRollup')
+    sums = {field: Sum(field) for field in SUM_FIELDS}
+
+    catalog = list(CalculationRollup.objects.values('period', 'panel_id').annotate(**sums).order_by())
+    CalculationRollup.objects.all().delete()
+    CalculationRollup.objects.bulk_create((CalculationRollup(**row) for row in catalog), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0006_split_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='calculationrollup',
+            name='calculator__period_976cac_idx',
+        ),
+        migrations.RemoveField(
+            model_name='calculationrollup',
+            name='region',
+        ),
+        migrations.RunPython(collapse_regions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='calculationrollup',
+            index=models.Index(fields=['period', 'panel'], name='calculator__period_04a426_idx'),
+        ),
+    ]
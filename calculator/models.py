@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -31,6 +33,20 @@ class Region(models.Model):
         return self.name
 
 
+class CatalogVersion(models.Model):
+    """
+    Номер версии каталога (одна строка, id=1).
+
+    Увеличивается при любом изменении регионов и панелей (сигналы, bulk-операции);
+    процессы сверяют с ним каталог, закешированный в памяти (services.catalog).
+    """
+
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Каталог v{self.version}"
+
+
 class Calculation(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     region = models.ForeignKey(Region, on_delete=models.CASCADE)
@@ -50,8 +66,137 @@ class Calculation(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Сортировка по умолчанию и фильтр по дате в админке
+            models.Index(fields=['created_at']),
+            # Фильтр по региону с сортировкой по дате
+            models.Index(fields=['region', 'created_at']),
+            # История пользователя (фильтр по пользователю, сортировка по дате)
+            models.Index(fields=['user', 'created_at']),
+        ]
         verbose_name = "Расчет"
         verbose_name_plural = "Расчеты"
 
     def __str__(self):
-        return f"Расчет от {self.created_at.strftime('%d.%m.%Y')}"
\ No newline at end of file
+        return f"Расчет от {self.created_at.strftime('%d.%m.%Y')}"
+
+
+
+class ArchivedCalculation(models.Model):
+    """
+    Архивная копия старого расчёта (manage.py archive_calculations).
+
+    Хранится компактно: без внешних ключей-ограничений, деньги — float,
+    id совпадает с id исходного расчёта, period — первый день месяца создания.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    period = models.DateField(db_index=True)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True,
+                             db_constraint=False, related_name='+')
+    region = models.ForeignKey(Region, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                               related_name='+')
+    panel = models.ForeignKey(SolarPanel, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                              related_name='+')
+    panel_count = models.SmallIntegerField()
+    monthly_consumption = models.FloatField()
+    total_cost = models.FloatField(null=True)
+    yearly_production_kwh = models.FloatField(null=True)
+    yearly_saving = models.FloatField(null=True)
+    payback_years = models.FloatField(null=True)
+    co2_saved_kg = models.FloatField(null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Архивный расчет"
+        verbose_name_plural = "Архивные расчеты"
+
+
+class RollupSums(models.Model):
+    """Суммы по заархивированным расчётам: из них складываются итоги и средние."""
+
+    calculations = models.IntegerField(default=0)
+    payback_count = models.IntegerField(default=0, help_text="Расчётов с заполненным сроком окупаемости")
+    payback_sum = models.FloatField(default=0)
+    co2_saved_sum = models.FloatField(default=0)
+    total_cost_sum = models.FloatField(default=0)
+    yearly_saving_sum = models.FloatField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class CalculationRollup(RollupSums):
+    """
+    Помесячные агрегаты архива по панелям (месяц x панель) — для главной.
+
+    Статистика на главной = агрегаты по «горячей» таблице + эти суммы. Регион
+    в ключ не входит: главной он не нужен, а с ним агрегат почти не сжимал архив.
+    """
+
+    period = models.DateField()
+    panel = models.ForeignKey(SolarPanel, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['period', 'panel']),
+        ]
+        verbose_name = "Агрегат архива"
+        verbose_name_plural = "Агрегаты архива"
+
+
+class UserCalculationRollup(RollupSums):
+    """
+    Помесячные агрегаты архива по пользователю (месяц x пользователь) — для истории.
+
+    Анонимные расчёты сюда не попадают: истории у них нет.
+    """
+
+    period = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'period']),
+        ]
+        verbose_name = "Агрегат архива по пользователю"
+        verbose_name_plural = "Агрегаты архива по пользователям"
+
+class Job(models.Model):
+    """Фоновая задача (тяжёлые расчёты, импорт), выполняется командой runworker."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, verbose_name="Тип задачи")
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.FloatField(default=0, verbose_name="Прогресс (0..1)")
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+
+    def __str__(self):
+        return f"{self.kind} [{self.get_status_display()}]"
@@ -0,0 +1,184 @@
+import contextvars
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_ADMISSION = {
+    'ENABLED': True,
+    # Алиас CACHES для корзин и слотов: чтобы лимиты действовали на все процессы
+    # узла, кеш должен быть общим для них (FileBasedCache, memcached, redis)
+    'CACHE': 'default',
+    # Корзины токенов по областям: (токенов в секунду, размер корзины)
+    'RATES': {
+        'calculate': (1.0, 10),
+        'api': (5.0, 50),
+        # Пакетный API платит за элемент (calculator.api.item_cost), а не за запрос
+        'api_batch': (20.0, 2000),
+        'api_jobs': (0.5, 5),
+    },
+    # Свои лимиты отдельных клиентов (партнёрские CRM и т. п.): {клиент: {область: (rate, burst) или None}}.
+    # Клиент — как в client_id: 'user_<id пользователя>' или 'ip_<адрес>'; None — без ограничения
+    'CLIENT_RATES': {},
+    # Сколько одновременных «дорогих» этапов допускается на все процессы
+    'STAGE_LIMITS': {
+        'render': 4,
+        'upstream': 8,
+    },
+    # Сколько ждать свободный этап вне веб-запросов (фоновые задачи, команды), с
+    'STAGE_WAIT': 30,
+    # Retry-After при занятых этапах, с
+    'STAGE_RETRY_AFTER': 2,
+    # Срок аренды слота этапа, с: слот процесса, убитого посреди этапа, освобождается
+    # не позже чем через STAGE_TTL (должен быть больше самого долгого этапа)
+    'STAGE_TTL': 300,
+    # Заголовок с адресом клиента от доверенного прокси (например, 'HTTP_X_REAL_IP')
+    'CLIENT_IP_HEADER': None,
+}
+
+# В веб-запросе под admission_control этапы отказывают сразу (429), вне его — ждут
+_fail_fast = contextvars.ContextVar('admission_fail_fast', default=False)
+
+
+class AdmissionRejected(Exception):
+    """Запрос не допущен: корзина клиента пуста или все слоты дорогого этапа заняты."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def admission_settings():
+    config = dict(DEFAULT_ADMISSION)
+    config.update(getattr(settings, 'ADMISSION', {}))
+    return config
+
+
+def client_id(request):
+    """Клиент для корзины: пользователь, если вошёл, иначе IP-адрес."""
+    if request.user.is_authenticated:
+        return f"user_{request.user.pk}"
+    header = admission_settings()['CLIENT_IP_HEADER']
+    address = request.META.get(header) if header else None
+    return f"ip_{(address or request.META.get('REMOTE_ADDR', '')).split(',')[0].strip()}"
+
+
+def _cache():
+    return caches[admission_settings()['CACHE']]
+
+
+def _bucket_rate(config, scope, client):
+    """(rate, burst) корзины клиента: свой лимит из CLIENT_RATES или общий; None — без ограничения."""
+    if not config['ENABLED']:
+        return None
+    client_rates = config['CLIENT_RATES'].get(client, {})
+    if scope in client_rates:
+        return client_rates[scope]
+    return config['RATES'].get(scope)
+
+
+def bucket_size(scope, client):
+    """Размер корзины клиента в области scope или None, если она не ограничена."""
+    rate = _bucket_rate(admission_settings(), scope, client)
+    return rate[1] if rate else None
+
+
+def take_token(scope, client, cost=1):
+    """
+    Берёт cost токенов из корзины клиента в области scope (корзина хранится в кеше).
+
+    Корзина пополняется со скоростью rate токенов в секунду до размера burst.
+    Возвращает 0, если запрос допущен, иначе — сколько секунд ждать. Чтение и
+    запись не атомарны: одновременные запросы одного клиента могут прочитать
+    одно и то же состояние корзины и пройти все, а последняя запись затрёт
+    списания остальных. Лимит строгий для последовательных запросов клиента,
+    а при параллельных может быть превышен на их число.
+    """
+    config = admission_settings()
+    bucket = _bucket_rate(config, scope, client)
+    if bucket is None:
+        return 0
+    rate, burst = bucket
+    cache = _cache()
+
+    key = f"admission_bucket_{scope}_{client}"
+    now = time.time()
+    state = cache.get(key)
+    tokens = burst if state is None else min(burst, state[0] + (now - state[1]) * rate)
+    # Полная корзина восстанавливается за burst / rate секунд — дольше хранить незачем
+    timeout = math.ceil(burst / rate) + 1
+
+    if tokens < cost:
+        cache.set(key, (tokens, now), timeout)
+        return (cost - tokens) / rate
+    cache.set(key, (tokens - cost, now), timeout)
+    return 0
+
+
+def _holder():
+    return f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def _acquire_slot(cache, name, limit, holder, ttl):
+    """Арендует свободный слот этапа (cache.add) и возвращает его ключ или None."""
+    for slot in range(limit):
+        key = f"admission_stage_{name}_{slot}"
+        if cache.add(key, holder, ttl):
+            return key
+    return None
+
+
+def _release_slot(cache, key, holder):
+    # Аренда могла истечь и перейти к другому процессу — чужой слот не трогаем
+    if cache.get(key) == holder:
+        cache.delete(key)
+
+
+@contextmanager
+def stage(name):
+    """
+    Ограничивает число одновременных дорогих этапов (графики, запросы к внешним API).
+
+    Каждый из limit слотов — отдельный ключ-аренда в общем кеше со своим сроком
+    STAGE_TTL: этап занимает свободный слот через cache.add и удаляет его по
+    окончании, а слот убитого процесса истекает сам. В веб-запросе при занятых
+    слотах сразу поднимается AdmissionRejected; в фоновых задачах и командах
+    этап ждёт свободный слот до STAGE_WAIT секунд.
+    """
+    config = admission_settings()
+    limit = config['STAGE_LIMITS'].get(name)
+    if not config['ENABLED'] or not limit:
+        yield
+        return
+
+    cache = _cache()
+    holder = _holder()
+    deadline = time.monotonic() + (0 if _fail_fast.get() else config['STAGE_WAIT'])
+    while True:
+        key = _acquire_slot(cache, name, limit, holder, config['STAGE_TTL'])
+        if key is not None:
+            break
+        if time.monotonic() >= deadline:
+            raise AdmissionRejected(f"Все слоты этапа {name} заняты", config['STAGE_RETRY_AFTER'])
+        time.sleep(0.05)
+
+    try:
+        yield
+    finally:
+        _release_slot(cache, key, holder)
+
+
+@contextmanager
+def fail_fast():
+    """Внутри веб-запроса: занятые этапы отказывают сразу, а не ждут."""
+    token = _fail_fast.set(True)
+    try:
+        yield
+    finally:
+        _fail_fast.reset(token)
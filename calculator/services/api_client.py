@@ -1,13 +1,19 @@
 import requests
 import json
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.core.cache import cache
 
+from .admission import stage
+
 class EnergyDataClient:
     """Клиент для получения данных из внешних API (согласно ТЗ: NASA POWER API, Mock API поставщиков)."""
 
-    NASA_API_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
-    CACHE_VERSION = "v2_calib165"
+    # Переопределяется в settings (например, адресом локального стаба для нагрузочных тестов)
+    NASA_API_URL = getattr(settings, 'NASA_API_URL', "https://power.larc.nasa.gov/api/temporal/daily/point")
+    CACHE_VERSION = "v3_daily"
+    # Коэффициент перевода годовой радиации в солнечные часы
+    CALIBRATION_FACTOR = 1.65
 
     def get_tariffs_by_region(self, region_code):
         """Получает тарифы на электроэнергию по коду региона (Mock API поставщиков)."""
@@ -29,6 +35,14 @@ class EnergyDataClient:
             region_code, {'day': 5.5, 'night': 3.5, 'updated': '2026-01-01'})
 
 
+    def _cache_key(self, latitude, longitude, start_date, end_date):
+        return f"nasa_{self.CACHE_VERSION}_{latitude}_{longitude}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+
+    def get_cached_irradiance(self, latitude, longitude):
+        """Данные за последние 365 дней, только если они уже есть в кеше (без запроса к API)."""
+        end_date = datetime.now()
+        return cache.get(self._cache_key(latitude, longitude, end_date - timedelta(days=365), end_date))
+
     def get_solar_irradiance(self, latitude, longitude, start_date=None, end_date=None):
         """
         Получает РЕАЛЬНЫЕ данные по солнечной инсоляции из NASA POWER API.
@@ -51,7 +65,7 @@ class EnergyDataClient:
             start_date = datetime.strptime(start_date, '%Y%m%d')
 
         # Проверяем кеш (чтобы не делать лишние запросы к API)
-        cache_key = f"nasa_{self.CACHE_VERSION}_{latitude}_{longitude}_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
+        cache_key = self._cache_key(latitude, longitude, start_date, end_date)
         cached_data = cache.get(cache_key)
 
         if cached_data:
@@ -73,7 +87,8 @@ class EnergyDataClient:
             print(f"[NASA API] Запрос данных для координат ({latitude}, {longitude})...")
 
             # Делаем запрос к NASA API
-            response = requests.get(self.NASA_API_URL, params=params, timeout=30)
+            with stage('upstream'):
+                response = requests.get(self.NASA_API_URL, params=params, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -128,38 +143,43 @@ class EnergyDataClient:
                 print("[NASA API] Нет валидных значений в данных")
                 return self._get_fallback_data(55.7558, 37.6173)
 
-            # Средняя дневная радиация (кВт·ч/м²/день)
-            avg_daily_radiation = sum(valid_values) / len(valid_values)
+            return self._summarize_daily_values(valid_values, len(daily_values))
+
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"[NASA API] Ошибка обработки данных: {e}")
+            return self._get_fallback_data(55.7558, 37.6173) #Москва
 
-            # Годовая радиация (кВт·ч/м²/год)
-            annual_radiation = avg_daily_radiation * 365
+    def _summarize_daily_values(self, valid_values, total_count):
+        """Считает годовые показатели по ряду валидных дневных значений радиации."""
+        # Средняя дневная радиация (кВт·ч/м²/день)
+        avg_daily_radiation = sum(valid_values) / len(valid_values)
 
-            # КАЛИБРОВКА: умножаем на коэффициент 1.65 (с точными результатами проблемки)
-            calibration_factor = 1.65
+        # Годовая радиация (кВт·ч/м²/год)
+        annual_radiation = avg_daily_radiation * 365
 
-            # КОНВЕРТАЦИЯ в солнечные часы:
-            # Формула: annual_sun_hours = annual_radiation * 1000 / (1000 Вт/м²)
-            # Где 1000 Вт/м² - стандартная солнечная постоянная
-            annual_sun_hours = int(annual_radiation * calibration_factor)
+        # КАЛИБРОВКА: умножаем на коэффициент 1.65 (с точными результатами проблемки)
+        calibration_factor = self.CALIBRATION_FACTOR
 
-            # Рассчитываем статистику
-            min_radiation = min(valid_values)
-            max_radiation = max(valid_values)
+        # КОНВЕРТАЦИЯ в солнечные часы:
+        # Формула: annual_sun_hours = annual_radiation * 1000 / (1000 Вт/м²)
+        # Где 1000 Вт/м² - стандартная солнечная постоянная
+        annual_sun_hours = int(annual_radiation * calibration_factor)
 
-            return {
-                'annual_sun_hours': annual_sun_hours,
-                'annual_radiation_kwh_m2': round(annual_radiation, 1),
-                'avg_daily_radiation_kwh_m2': round(avg_daily_radiation, 3),
-                'min_daily_radiation_kwh_m2': round(min_radiation, 3),
-                'max_daily_radiation_kwh_m2': round(max_radiation, 3),
-                'data_points': len(valid_values),
-                'data_quality': f"{len(valid_values) / len(daily_values) * 100:.1f}%",
-                'raw_values_sample': valid_values[:5]  # первые 5 значений для отладки
-            }
+        # Рассчитываем статистику
+        min_radiation = min(valid_values)
+        max_radiation = max(valid_values)
 
-        except (KeyError, ValueError, TypeError) as e:
-            print(f"[NASA API] Ошибка обработки данных: {e}")
-            return self._get_fallback_data(55.7558, 37.6173) #Москва
+        return {
+            'annual_sun_hours': annual_sun_hours,
+            'annual_radiation_kwh_m2': round(annual_radiation, 1),
+            'avg_daily_radiation_kwh_m2': round(avg_daily_radiation, 3),
+            'min_daily_radiation_kwh_m2': round(min_radiation, 3),
+            'max_daily_radiation_kwh_m2': round(max_radiation, 3),
+            'data_points': len(valid_values),
+            'data_quality': f"{len(valid_values) / total_count * 100:.1f}%",
+            'raw_values_sample': valid_values[:5],  # первые 5 значений для отладки
+            'daily_values': valid_values  # полный дневной ряд (для Monte Carlo)
+        }
 
     def _get_fallback_data(self, latitude, longitude):
         """Возвращает fallback-данные, если NASA API недоступен."""
@@ -0,0 +1,159 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+# Поля расчёта, которые переносятся в архив
+ARCHIVE_FIELDS = ['id', 'user_id', 'region_id', 'panel_id', 'panel_count', 'monthly_consumption',
+                  'total_cost', 'yearly_production_kwh', 'yearly_saving', 'payback_years',
+                  'co2_saved_kg', 'created_at']
+
+# Суммируемые поля помесячного агрегата
+ROLLUP_FIELDS = ['calculations', 'payback_count', 'payback_sum', 'co2_saved_sum',
+                 'total_cost_sum', 'yearly_saving_sum']
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _month_bounds(month):
+    """Границы месяца как aware datetime в UTC (created_at хранится в UTC)."""
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end_month = _next_month(month)
+    return start, datetime(end_month.year, end_month.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _as_float(value):
+    return float(value) if value is not None else None
+
+
+def _add_to_group(groups, key, row):
+    group = groups.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+    group['calculations'] += 1
+    if row['payback_years'] is not None:
+        group['payback_count'] += 1
+        group['payback_sum'] += row['payback_years']
+    group['co2_saved_sum'] += row['co2_saved_kg'] or 0.0
+    group['total_cost_sum'] += _as_float(row['total_cost']) or 0.0
+    group['yearly_saving_sum'] += _as_float(row['yearly_saving']) or 0.0
+
+
+def _merge_rollups(model, key_fields, groups):
+    """
+    Прибавляет суммы groups {ключ: суммы} к агрегатам model (ключ — значения key_fields).
+
+    Существующие агрегаты читаются только по значениям ключей пакета (пакет
+    не выходит за месяц), а не все агрегаты его месяцев: чтение не растёт
+    с объёмом уже заархивированных данных.
+    """
+    if not groups:
+        return
+    lookups = {f'{field}__in': {key[position] for key in groups} for position, field in enumerate(key_fields)}
+    existing = {
+        tuple(getattr(rollup, field) for field in key_fields): rollup
+        for rollup in model.objects.filter(**lookups)
+    }
+
+    to_create, to_update = [], []
+    for key, group in groups.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            to_create.append(model(**dict(zip(key_fields, key)), **group))
+        else:
+            for field, value in group.items():
+                setattr(rollup, field, getattr(rollup, field) + value)
+            to_update.append(rollup)
+
+    model.objects.bulk_create(to_create)
+    model.objects.bulk_update(to_update, ROLLUP_FIELDS)
+
+
+def _archive_batch(rows):
+    """
+    Переносит пакет расчётов в архив и добавляет их в помесячные агрегаты (одна транзакция).
+
+    Агрегатов два: месяц x панель (главная) и месяц x пользователь
+    (история); анонимные расчёты в пользовательские агрегаты не попадают.
+    """
+    from ..models import ArchivedCalculation, Calculation, CalculationRollup, UserCalculationRollup
+
+    archived = []
+    catalog_groups, user_groups = {}, {}
+    for row in rows:
+        period = _month_start(row['created_at'])
+        archived.append(ArchivedCalculation(
+            id=row['id'],
+            period=period,
+            user_id=row['user_id'],
+            region_id=row['region_id'],
+            panel_id=row['panel_id'],
+            panel_count=row['panel_count'],
+            monthly_consumption=row['monthly_consumption'],
+            total_cost=_as_float(row['total_cost']),
+            yearly_production_kwh=row['yearly_production_kwh'],
+            yearly_saving=_as_float(row['yearly_saving']),
+            payback_years=row['payback_years'],
+            co2_saved_kg=row['co2_saved_kg'],
+            created_at=row['created_at'],
+        ))
+
+        _add_to_group(catalog_groups, (period, row['panel_id']), row)
+        if row['user_id'] is not None:
+            _add_to_group(user_groups, (period, row['user_id']), row)
+
+    with transaction.atomic():
+        ArchivedCalculation.objects.bulk_create(archived, ignore_conflicts=True)
+        _merge_rollups(CalculationRollup, ['period', 'panel_id'], catalog_groups)
+        _merge_rollups(UserCalculationRollup, ['period', 'user_id'], user_groups)
+        Calculation.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+
+
+def archive_calculations(cutoff, batch_size=2000, dry_run=False):
+    """
+    Переносит расчёты старше cutoff из «горячей» таблицы в архив, месяц за месяцем.
+
+    Внутри месяца строки идут пакетами по первичному ключу, каждый пакет —
+    отдельная короткая транзакция, чтобы не блокировать запись надолго.
+    Возвращает {месяц 'YYYY-MM': перенесено строк}.
+    """
+    from ..models import Calculation
+
+    old = Calculation.objects.filter(created_at__lt=cutoff)
+    first = old.order_by('created_at').values_list('created_at', flat=True).first()
+    if first is None:
+        return {}
+
+    report = {}
+    month, last_month = _month_start(first), _month_start(cutoff)
+    while month <= last_month:
+        month_start, month_end = _month_bounds(month)
+        partition = old.filter(created_at__gte=month_start, created_at__lt=month_end).order_by('pk')
+
+        moved = 0
+        if dry_run:
+            moved = partition.count()
+        else:
+            last_pk = 0
+            while True:
+                rows = list(partition.filter(pk__gt=last_pk).values(*ARCHIVE_FIELDS)[:batch_size])
+                if not rows:
+                    break
+                _archive_batch(rows)
+                moved += len(rows)
+                last_pk = rows[-1]['id']
+
+        if moved:
+            report[month.strftime('%Y-%m')] = moved
+            print(f"[Archive] {month:%Y-%m}: {'будет перенесено' if dry_run else 'перенесено'} {moved}")
+        month = _next_month(month)
+
+    if not dry_run and connection.vendor == 'sqlite':
+        # Обновляем статистику планировщика (и оценки числа строк для админки)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA optimize")
+
+    return report
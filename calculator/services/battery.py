@@ -0,0 +1,103 @@
+import numpy as np
+
+# Двухзонный тариф: день 7:00–23:00, ночь 23:00–7:00
+DAY_TARIFF_HOURS = range(7, 23)
+
+# Доля дневной выработки по часам: полусинусоида с 6:00 до 20:00
+_sun = np.clip(np.sin(np.pi * (np.arange(24) + 0.5 - 6) / 14), 0, None)
+SOLAR_PROFILE = _sun / _sun.sum()
+
+# Типичный профиль потребления дома: ночной минимум, утренний и вечерний пики
+_load = np.array([0.5, 0.4, 0.4, 0.4, 0.4, 0.5, 0.8, 1.2, 1.3, 1.0, 0.9, 0.9,
+                  0.9, 0.9, 0.9, 1.0, 1.1, 1.4, 1.7, 1.9, 1.8, 1.5, 1.1, 0.7])
+LOAD_PROFILE = _load / _load.sum()
+
+# КПД заряда-разряда (туда и обратно) и допустимая глубина разряда
+ROUND_TRIP_EFFICIENCY = 0.9
+DEPTH_OF_DISCHARGE = 0.9
+
+# Стоимость аккумулятора с установкой, руб. за кВт·ч ёмкости
+DEFAULT_BATTERY_PRICE_PER_KWH = 35000
+
+DEFAULT_CAPACITIES = np.arange(0, 20.5, 1.0)
+
+
+def hourly_profiles(daily_production_kwh, yearly_consumption_kwh):
+    """Почасовые ряды выработки и потребления (дни x 24 -> плоский массив)."""
+    daily_production_kwh = np.asarray(daily_production_kwh, dtype=float)
+    production = (daily_production_kwh[:, None] * SOLAR_PROFILE).ravel()
+    daily_load = yearly_consumption_kwh / 365
+    load = np.tile(daily_load * LOAD_PROFILE, len(daily_production_kwh))
+    return production, load
+
+
+def simulate_battery(daily_production_kwh, yearly_consumption_kwh, tariff_day, tariff_night,
+                     system_cost, capacities=DEFAULT_CAPACITIES,
+                     battery_price_per_kwh=DEFAULT_BATTERY_PRICE_PER_KWH):
+    """
+    Почасовая симуляция аккумулятора сразу для набора ёмкостей.
+
+    Излишек выработки заряжает аккумулятор, нехватка покрывается разрядом;
+    экономия считается по дневному или ночному тарифу часа. Состояние заряда —
+    вектор по всем ёмкостям, поэтому год симулируется одним проходом по часам.
+    Ёмкость 0 — система без аккумулятора (прямое потребление выработки).
+    Возвращает кривую экономии и окупаемости по ёмкости и оптимальную ёмкость.
+    """
+    capacities = np.asarray(capacities, dtype=float)
+    days = len(daily_production_kwh)
+    production, load = hourly_profiles(daily_production_kwh, yearly_consumption_kwh)
+
+    is_day = np.isin(np.arange(len(production)) % 24, DAY_TARIFF_HOURS)
+    tariff = np.where(is_day, tariff_day, tariff_night)
+
+    direct = np.minimum(production, load)
+    surplus = production - direct
+    deficit = load - direct
+    direct_saving = float((direct * tariff).sum())
+
+    charge_efficiency = discharge_efficiency = np.sqrt(ROUND_TRIP_EFFICIENCY)
+    usable = capacities * DEPTH_OF_DISCHARGE
+    charge = np.zeros_like(capacities)
+    battery_saving = np.zeros_like(capacities)
+    discharged = np.zeros_like(capacities)
+
+    # Только часы, где что-то происходит: излишек (заряд) или нехватка (разряд)
+    for hour in np.flatnonzero((surplus > 0) | (deficit > 0)):
+        if surplus[hour] > 0:
+            charge = np.minimum(usable, charge + surplus[hour] * charge_efficiency)
+        else:
+            delivered = np.minimum(deficit[hour], charge * discharge_efficiency)
+            charge -= delivered / discharge_efficiency
+            discharged += delivered
+            battery_saving += delivered * tariff[hour]
+
+    # Приводим к году, если ряд выработки не ровно 365 дней
+    scale = 365 / days
+    yearly_saving = (direct_saving + battery_saving) * scale
+    battery_cost = capacities * battery_price_per_kwh
+    total_cost = system_cost + battery_cost
+    payback = np.divide(total_cost, yearly_saving, out=np.zeros_like(yearly_saving), where=yearly_saving > 0)
+    battery_payback = np.divide(battery_cost, battery_saving * scale,
+                                out=np.zeros_like(battery_saving), where=battery_saving > 0)
+
+    self_consumption = (direct.sum() + discharged) / production.sum() * 100 if production.sum() else np.zeros_like(capacities)
+    # Оптимум — минимальный срок окупаемости всей системы
+    candidates = np.flatnonzero(yearly_saving > 0)
+    optimal = int(candidates[np.argmin(payback[candidates])]) if len(candidates) else 0
+
+    return {
+        'capacities_kwh': np.round(capacities, 2).tolist(),
+        'yearly_saving': np.round(yearly_saving, 2).tolist(),
+        'battery_saving': np.round(battery_saving * scale, 2).tolist(),
+        'battery_cost': np.round(battery_cost, 2).tolist(),
+        'payback_years': np.round(payback, 1).tolist(),
+        'battery_payback_years': np.round(battery_payback, 1).tolist(),
+        'self_consumption_percentage': np.round(self_consumption, 1).tolist(),
+        'optimal_capacity_kwh': round(float(capacities[optimal]), 2),
+        'optimal_payback_years': round(float(payback[optimal]), 1),
+        'optimal_yearly_saving': round(float(yearly_saving[optimal]), 2),
+        'tariff_day': tariff_day,
+        'tariff_night': tariff_night,
+        'battery_price_per_kwh': battery_price_per_kwh,
+        'round_trip_efficiency': ROUND_TRIP_EFFICIENCY,
+    }
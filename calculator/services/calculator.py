@@ -1,12 +1,19 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from io import BytesIO
 import base64
+from django.conf import settings
+
+from .admission import stage
 
 class SolarROICalculator:
     """Основной калькулятор окупаемости."""
 
-    def __init__(self, panel, panel_count, region, monthly_consumption):
+    # Стоимость монтажа и комплектующих: +30% к цене панелей
+    INSTALLATION_FACTOR = 1.3
+
+    def __init__(self, panel, panel_count, region, monthly_consumption, solar_data=None):
         self.panel = panel
         self.panel_count = panel_count
         self.region = region
@@ -14,21 +21,35 @@ class SolarROICalculator:
 
         from .api_client import EnergyDataClient
         self.api_client = EnergyDataClient()
+        # Можно передать заранее полученные данные инсоляции (пакетные пересчёты)
+        self._solar_data = solar_data
 
-    def calculate(self):
-        """Основной метод расчета. Возвращает словарь с результатами и графиком."""
+    def get_solar_data(self):
+        """Данные по инсоляции для региона (запрашиваются один раз на экземпляр)."""
+        if self._solar_data is None:
+            # Режим типичного года по многолетнему архиву (если он уже загружен)
+            years = getattr(settings, 'NASA_CLIMATOLOGY_YEARS', 0)
+            if years and self.region.latitude is not None and self.region.longitude is not None:
+                from .climatology import ClimatologyStore
+                self._solar_data = ClimatologyStore().get_typical_year(
+                    self.region.latitude, self.region.longitude, years=years
+                )
+
+        if self._solar_data is None:
+            self._solar_data = self.api_client.get_solar_irradiance(
+                latitude=self.region.latitude,
+                longitude=self.region.longitude
+            )
+        return self._solar_data
+
+    def _compute(self):
+        """Числовая часть расчёта без округления, таблицы и графика."""
 
         total_power_w = self.panel.power_w * self.panel_count
         total_power_kw = total_power_w / 1000
 
-        from .api_client import EnergyDataClient
-        api_client = EnergyDataClient()
-
         # Данные по солнечной инсоляции из NASA API
-        solar_data = api_client.get_solar_irradiance(
-            latitude=self.region.latitude,
-            longitude=self.region.longitude
-        )
+        solar_data = self.get_solar_data()
 
         real_sun_hours = solar_data['annual_sun_hours']
 
@@ -52,7 +73,7 @@ class SolarROICalculator:
         yearly_saving = effective_production_kwh * float(self.region.tariff_day)
 
         # Стоимость системы
-        system_cost = float(self.panel.price) * self.panel_count * 1.3
+        system_cost = float(self.panel.price) * self.panel_count * self.INSTALLATION_FACTOR
 
         # Срок окупаемости
         payback_years = system_cost / yearly_saving if yearly_saving > 0 else 0
@@ -60,11 +81,162 @@ class SolarROICalculator:
         # Излишки производства (если есть)
         excess_production_kwh = max(0, yearly_production_kwh - yearly_consumption_kwh)
 
+        return {
+            'system_cost': system_cost,
+            'total_power_kw': total_power_kw,
+            'yearly_production_kwh': yearly_production_kwh,
+            'yearly_consumption_kwh': yearly_consumption_kwh,
+            'effective_production_kwh': effective_production_kwh,
+            'coverage_percentage': coverage_percentage,
+            'excess_production_kwh': excess_production_kwh,
+            'yearly_saving': yearly_saving,
+            'payback_years': payback_years,
+            'data_source': data_source,
+            'real_sun_hours': real_sun_hours,
+        }
+
+    @staticmethod
+    def _format_metrics(raw):
+        """Округляет сырые значения расчёта до вида, в котором они сохраняются и показываются."""
+        return {
+            'total_cost': round(raw['system_cost'], 2),
+            'system_power_kw': round(raw['total_power_kw'], 2),
+            'yearly_production_kwh': round(raw['yearly_production_kwh'], 0),
+            'yearly_saving': round(raw['yearly_saving'], 2),
+            'payback_years': round(raw['payback_years'], 1),
+            'co2_saved_kg': round(raw['yearly_production_kwh'] * 0.5, 0),  # упрощенный расчет CO2
+            'yearly_consumption_kwh': round(raw['yearly_consumption_kwh'], 0),
+            'effective_production_kwh': round(raw['effective_production_kwh'], 0),
+            'coverage_percentage': round(raw['coverage_percentage'], 1),
+            'excess_production_kwh': round(raw['excess_production_kwh'], 0),
+            'is_overproduction': raw['yearly_production_kwh'] > raw['yearly_consumption_kwh'],
+            'solar_data_source': raw['data_source'],
+            'real_sun_hours': raw['real_sun_hours'],
+        }
+
+    def calculate_metrics(self):
+        """Только числовые результаты расчёта (без DataFrame и графика) — для API."""
+        return self._format_metrics(self._compute())
+
+    def calculate_uncertainty(self, draws=10000, tariff_sigma=0.0, price_sigma=0.0, seed=None):
+        """
+        Monte Carlo оценка неопределённости: P10/P50/P90 выработки, экономии и окупаемости.
+
+        Бутстрэп радиации NASA (по годам архива, если он есть, иначе по сезонам
+        дневного ряда), опционально с разбросом тарифа и цены.
+        """
+        from .monte_carlo import simulate_roi
+
+        solar_data = self.get_solar_data()
+        total_power_kw = self.panel.power_w * self.panel_count / 1000
+
+        return simulate_roi(
+            daily_radiation=solar_data.get('daily_values'),
+            daily_by_year=solar_data.get('daily_by_year'),
+            annual_sun_hours=solar_data['annual_sun_hours'],
+            total_power_kw=total_power_kw,
+            efficiency=self.panel.efficiency,
+            yearly_consumption_kwh=self.monthly_consumption * 12,
+            tariff=float(self.region.tariff_day),
+            system_cost=float(self.panel.price) * self.panel_count * self.INSTALLATION_FACTOR,
+            calibration_factor=self.api_client.CALIBRATION_FACTOR,
+            draws=draws,
+            tariff_sigma=tariff_sigma,
+            price_sigma=price_sigma,
+            seed=seed,
+        )
+
+    def calculate_sensitivity(self, steps=None):
+        """Данные для tornado-диаграммы: как меняются экономия и окупаемость при отклонении каждого параметра."""
+        from .sensitivity import sensitivity_analysis, DEFAULT_STEPS
+
+        solar_data = self.get_solar_data()
+
+        return sensitivity_analysis(
+            tariff=float(self.region.tariff_day),
+            price=float(self.panel.price),
+            installation_factor=self.INSTALLATION_FACTOR,
+            efficiency=self.panel.efficiency,
+            sun_hours=solar_data['annual_sun_hours'],
+            monthly_consumption=self.monthly_consumption,
+            total_power_kw=self.panel.power_w * self.panel_count / 1000,
+            panel_count=self.panel_count,
+            steps=steps or DEFAULT_STEPS,
+        )
+
+    def calculate_battery(self, capacities=None, battery_price_per_kwh=None):
+        """
+        Кривая «экономия и окупаемость от ёмкости аккумулятора» и оптимальная ёмкость.
+
+        Дневная выработка берётся из ряда радиации NASA (или равномерно по году),
+        масштабированного к годовой выработке основного расчёта.
+        """
+        from .battery import simulate_battery, DEFAULT_CAPACITIES, DEFAULT_BATTERY_PRICE_PER_KWH
+
+        solar_data = self.get_solar_data()
+        total_power_kw = self.panel.power_w * self.panel_count / 1000
+        yearly_production_kwh = total_power_kw * solar_data['annual_sun_hours'] * self.panel.efficiency
+
+        daily_values = solar_data.get('daily_values')
+        if daily_values:
+            daily = np.asarray(daily_values, dtype=float)
+            daily_production = daily / daily.mean() * yearly_production_kwh / 365
+        else:
+            daily_production = np.full(365, yearly_production_kwh / 365)
+
+        return simulate_battery(
+            daily_production_kwh=daily_production,
+            yearly_consumption_kwh=self.monthly_consumption * 12,
+            tariff_day=float(self.region.tariff_day),
+            tariff_night=float(self.region.tariff_night),
+            system_cost=float(self.panel.price) * self.panel_count * self.INSTALLATION_FACTOR,
+            capacities=DEFAULT_CAPACITIES if capacities is None else capacities,
+            # Явный 0 (аккумулятор уже есть) — допустимая цена, не «не задано»
+            battery_price_per_kwh=(DEFAULT_BATTERY_PRICE_PER_KWH if battery_price_per_kwh is None
+                                   else battery_price_per_kwh),
+        )
+
+    def calculate_report(self, monte_carlo_draws=None, tariff_sigma=None, price_sigma=None,
+                         sensitivity=False, sensitivity_range=None,
+                         battery=False, battery_max_kwh=None, battery_step_kwh=None,
+                         battery_price_per_kwh=None):
+        """Числовой отчёт для API и фоновых задач: метрики и, по запросу, Monte Carlo и чувствительность."""
+        result = self.calculate_metrics()
+
+        if monte_carlo_draws:
+            result['uncertainty'] = self.calculate_uncertainty(
+                draws=monte_carlo_draws,
+                tariff_sigma=tariff_sigma or 0.0,
+                price_sigma=price_sigma or 0.0,
+            )
+
+        if sensitivity:
+            spread = sensitivity_range or 0.2
+            result['sensitivity'] = self.calculate_sensitivity(
+                steps=(-spread, -spread / 2, spread / 2, spread)
+            )
+
+        if battery:
+            step = battery_step_kwh or 1.0
+            result['battery'] = self.calculate_battery(
+                capacities=np.arange(0, (battery_max_kwh or 20) + step / 2, step),
+                battery_price_per_kwh=battery_price_per_kwh,
+            )
+        return result
+
+    def calculate(self):
+        """Основной метод расчета. Возвращает словарь с результатами и графиком."""
+        raw = self._compute()
+
+        system_cost = raw['system_cost']
+        yearly_saving = raw['yearly_saving']
+        payback_years = raw['payback_years']
+
         df_data = {
             'Параметр': ['Мощность системы', 'Годовая выработка', 'Годовая экономия', 'Срок окупаемости'],
             'Значение': [
-                f"{round(total_power_kw, 2)} кВт",
-                f"{round(yearly_production_kwh, 0)} кВт*ч",
+                f"{round(raw['total_power_kw'], 2)} кВт",
+                f"{round(raw['yearly_production_kwh'], 0)} кВт*ч",
                 f"{round(yearly_saving, 2)} руб.",
                 f"{round(payback_years, 1)} лет"
             ],
@@ -74,23 +246,12 @@ class SolarROICalculator:
 
         roi_chart_base64 = self._generate_roi_chart(system_cost, yearly_saving, payback_years)
 
-        return {
-            'total_cost': round(system_cost, 2),
-            'system_power_kw': round(total_power_kw, 2),
-            'yearly_production_kwh': round(yearly_production_kwh, 0),
-            'yearly_saving': round(yearly_saving, 2),
-            'payback_years': round(payback_years, 1),
-            'co2_saved_kg': round(yearly_production_kwh * 0.5, 0),  # упрощенный расчет CO2
+        result = self._format_metrics(raw)
+        result.update({
             'calculation_df': results_df,
             'roi_chart': roi_chart_base64,
-            'yearly_consumption_kwh': round(yearly_consumption_kwh, 0),
-            'effective_production_kwh': round(effective_production_kwh, 0),
-            'coverage_percentage': round(coverage_percentage, 1),
-            'excess_production_kwh': round(excess_production_kwh, 0),
-            'is_overproduction': yearly_production_kwh > yearly_consumption_kwh,
-            'solar_data_source': data_source,
-            'real_sun_hours': real_sun_hours,
-        }
+        })
+        return result
 
     def _generate_roi_chart(self, system_cost, yearly_saving, payback_years):
         """Генерирует график окупаемости и возвращает его в виде строки base64."""
@@ -103,32 +264,34 @@ class SolarROICalculator:
         for year in years[1:]:
             cumulative_savings.append(yearly_saving * year)
 
-        # Построение графика
-        plt.figure(figsize=(10, 6))
-        plt.plot(years, cumulative_savings, 'b-', linewidth=2, label='Накопленная экономия')
-        plt.axhline(y=system_cost, color='r', linestyle='--', label=f'Стоимость системы ({system_cost:,.0f} руб.)')
-
-        # Вертикальная линия окупаемости, если она в пределах графика
-        if payback_years <= max_years:
-            plt.axvline(x=payback_years, color='g', linestyle=':', label=f'Окупаемость ({payback_years:.1f} лет)')
-
-        plt.fill_between(years, cumulative_savings, system_cost,
-                         where=[s <= system_cost for s in cumulative_savings],
-                         alpha=0.2, color='orange', label='Период окупаемости')
-
-        plt.title('График окупаемости солнечной электростанции', fontsize=14)
-        plt.xlabel('Годы', fontsize=12)
-        plt.ylabel('Рубли', fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.legend()
-        plt.tight_layout()
-
-        # Конвертация графика в base64 для вставки в HTML
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=100)
-        buffer.seek(0)
-        image_png = buffer.getvalue()
-        buffer.close()
-        plt.close()
+        # Рендеринг — дорогой этап: число одновременных графиков ограничено
+        with stage('render'):
+            # Построение графика
+            plt.figure(figsize=(10, 6))
+            plt.plot(years, cumulative_savings, 'b-', linewidth=2, label='Накопленная экономия')
+            plt.axhline(y=system_cost, color='r', linestyle='--', label=f'Стоимость системы ({system_cost:,.0f} руб.)')
+
+            # Вертикальная линия окупаемости, если она в пределах графика
+            if payback_years <= max_years:
+                plt.axvline(x=payback_years, color='g', linestyle=':', label=f'Окупаемость ({payback_years:.1f} лет)')
+
+            plt.fill_between(years, cumulative_savings, system_cost,
+                             where=[s <= system_cost for s in cumulative_savings],
+                             alpha=0.2, color='orange', label='Период окупаемости')
+
+            plt.title('График окупаемости солнечной электростанции', fontsize=14)
+            plt.xlabel('Годы', fontsize=12)
+            plt.ylabel('Рубли', fontsize=12)
+            plt.grid(True, alpha=0.3)
+            plt.legend()
+            plt.tight_layout()
+
+            # Конвертация графика в base64 для вставки в HTML
+            buffer = BytesIO()
+            plt.savefig(buffer, format='png', dpi=100)
+            buffer.seek(0)
+            image_png = buffer.getvalue()
+            buffer.close()
+            plt.close()
 
         return base64.b64encode(image_png).decode('utf-8')
\ No newline at end of file
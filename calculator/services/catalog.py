@@ -0,0 +1,94 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+
+class CatalogCache:
+    """
+    Версионируемый кеш каталога (регионы и панели) внутри процесса.
+
+    Сами объекты хранятся в памяти процесса, а номер версии — в БД
+    (CatalogVersion), общей для всех процессов. Сигналы post_save/post_delete
+    и bulk-операции увеличивают версию; каждый процесс сверяется с ней не чаще
+    раза в CATALOG_CHECK_SECONDS и при расхождении перечитывает каталог.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._regions = ()
+        self._panels = ()
+        self._regions_by_pk = {}
+        self._regions_by_code = {}
+        self._panels_by_pk = {}
+
+    def _current_version(self):
+        """Текущая версия каталога из БД (не чаще раза в CATALOG_CHECK_SECONDS)."""
+        interval = getattr(settings, 'CATALOG_CHECK_SECONDS', 5)
+        now = time.monotonic()
+        if self._version is not None and self._checked_at is not None and now - self._checked_at < interval:
+            return self._version
+
+        from ..models import CatalogVersion
+
+        version = CatalogVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+        self._checked_at = now
+        return version
+
+    def _ensure_loaded(self):
+        version = self._current_version()
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+
+            from ..models import Region, SolarPanel
+
+            regions = tuple(Region.objects.all())
+            panels = tuple(SolarPanel.objects.order_by('pk'))
+
+            self._regions = regions
+            self._panels = panels
+            self._regions_by_pk = {region.pk: region for region in regions}
+            self._regions_by_code = {region.code.upper(): region for region in regions}
+            self._panels_by_pk = {panel.pk: panel for panel in panels}
+            self._version = version
+            print(f"[Catalog] Загружен каталог: {len(regions)} регионов, {len(panels)} панелей")
+
+    def regions(self):
+        """Все регионы в порядке Region.Meta.ordering."""
+        self._ensure_loaded()
+        return self._regions
+
+    def panels(self):
+        """Все панели в порядке первичного ключа."""
+        self._ensure_loaded()
+        return self._panels
+
+    def get_region(self, pk):
+        self._ensure_loaded()
+        return self._regions_by_pk.get(pk)
+
+    def get_region_by_code(self, code):
+        self._ensure_loaded()
+        return self._regions_by_code.get(code.upper())
+
+    def get_panel(self, pk):
+        self._ensure_loaded()
+        return self._panels_by_pk.get(pk)
+
+    def invalidate(self):
+        """Увеличивает версию каталога в БД: все процессы перечитают его при следующей сверке."""
+        from ..models import CatalogVersion
+
+        if not CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1):
+            CatalogVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+        with self._lock:
+            self._version = None
+
+catalog_cache = CatalogCache()
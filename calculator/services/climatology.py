@@ -0,0 +1,350 @@
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .admission import stage
+from .api_client import EnergyDataClient
+
+# Строка на год: 366 дней, пропуски (нет данных / -999) хранятся как NaN
+DAYS_IN_ROW = 366
+
+# Региональный запрос NASA POWER: прямоугольник от 2 до 10 градусов по каждой оси
+REGIONAL_BOX_MAX = 10.0
+REGIONAL_BOX_MIN = 2.0
+
+
+def regional_boxes(lat_range, lon_range):
+    """Разбивает область на прямоугольники для регионального запроса NASA POWER."""
+    def spans(low, high):
+        start = low
+        while start < high:
+            end = min(start + REGIONAL_BOX_MAX, high)
+            if end - start < REGIONAL_BOX_MIN:
+                # Узкий остаток расширяем назад до минимального размера
+                start = max(low, end - REGIONAL_BOX_MIN)
+            yield start, end
+            start = end
+
+    return [(lat_min, lat_max, lon_min, lon_max)
+            for lat_min, lat_max in spans(*lat_range)
+            for lon_min, lon_max in spans(*lon_range)]
+
+
+class ClimatologyStore:
+    """
+    Локальный многолетний архив дневной радиации NASA POWER по точкам.
+
+    Для каждой точки хранится один сжатый .npz файл: массив лет и матрица
+    float32 (годы x 366 дней). Загрузка идёт чанками по одному году,
+    параллельно, с повторами; каждый скачанный год сразу сохраняется, поэтому
+    прерванная загрузка продолжается с места остановки, а обновление докачивает
+    только недостающие годы.
+    """
+
+    NASA_FILL_VALUE = -999.0
+    # Многолетние средние по площади (одна точка на ячейку сетки NASA, ~1°)
+    REGIONAL_API_URL = getattr(settings, 'NASA_REGIONAL_API_URL',
+                               "https://power.larc.nasa.gov/api/temporal/climatology/regional")
+
+    def __init__(self, data_dir=None, max_workers=4, retries=3, timeout=None):
+        self.data_dir = Path(data_dir or getattr(settings, 'CLIMATOLOGY_DIR', settings.BASE_DIR / 'climatology'))
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout or getattr(settings, 'NASA_API_TIMEOUT', 30)
+        self.api_client = EnergyDataClient()
+
+    def _path(self, latitude, longitude):
+        return self.data_dir / f"{latitude:.4f}_{longitude:.4f}.npz"
+
+    def _regional_path(self):
+        return self.data_dir / 'regional.npz'
+
+    def load(self, latitude, longitude):
+        """Возвращает (years, values) для точки или None, если архива ещё нет."""
+        path = self._path(latitude, longitude)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return data['years'], data['values']
+
+    def _save(self, latitude, longitude, years, values):
+        """Атомарно записывает архив точки (через временный файл)."""
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(latitude, longitude)
+        tmp_path = path.with_suffix('.tmp')
+        order = np.argsort(years)
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, years=np.asarray(years, dtype=np.int16)[order],
+                                values=np.asarray(values, dtype=np.float32)[order])
+        os.replace(tmp_path, path)
+
+    def _fetch_year(self, latitude, longitude, year):
+        """Скачивает один год дневных данных с повторами и экспоненциальной паузой."""
+        params = {
+            'parameters': 'ALLSKY_SFC_SW_DWN',
+            'community': 'RE',
+            'longitude': longitude,
+            'latitude': latitude,
+            'start': f"{year}0101",
+            'end': f"{year}1231",
+            'format': 'JSON'
+        }
+
+        last_error = None
+        for attempt in range(self.retries):
+            try:
+                with stage('upstream'):
+                    response = requests.get(self.api_client.NASA_API_URL, params=params, timeout=self.timeout)
+                if response.status_code == 200:
+                    return self._parse_year(response.json(), year)
+                last_error = f"HTTP {response.status_code}"
+            except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+                last_error = str(e)
+
+            if attempt + 1 < self.retries:
+                time.sleep(2 ** attempt)
+
+        raise RuntimeError(f"не удалось загрузить {year} год: {last_error}")
+
+    def _parse_year(self, nasa_data, year):
+        """Раскладывает ответ NASA по дням года в строку из 366 значений."""
+        radiation_data = nasa_data['properties']['parameter']['ALLSKY_SFC_SW_DWN']
+        row = np.full(DAYS_IN_ROW, np.nan, dtype=np.float32)
+        start = date(year, 1, 1).toordinal()
+
+        for day, value in radiation_data.items():
+            if value is None or value <= 0 or value == self.NASA_FILL_VALUE:
+                continue
+            day_index = date(int(day[:4]), int(day[4:6]), int(day[6:8])).toordinal() - start
+            if 0 <= day_index < DAYS_IN_ROW:
+                row[day_index] = value
+        return row
+
+    def update(self, latitude, longitude, years=10, until_year=None):
+        """
+        Докачивает недостающие полные годы за период [until_year - years + 1, until_year].
+
+        По умолчанию until_year — прошлый (последний завершённый) год. Возвращает
+        словарь с количеством загруженных лет и списком ошибок по годам.
+        """
+        until_year = until_year or date.today().year - 1
+        wanted = set(range(until_year - years + 1, until_year + 1))
+
+        stored = self.load(latitude, longitude)
+        if stored is not None:
+            stored_years, stored_values = list(stored[0]), list(stored[1])
+        else:
+            stored_years, stored_values = [], []
+
+        missing = sorted(wanted - {int(y) for y in stored_years})
+        if not missing:
+            return {'fetched': 0, 'errors': []}
+
+        print(f"[Climatology] ({latitude}, {longitude}): загружаем {len(missing)} лет")
+
+        fetched, errors = 0, []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_year, latitude, longitude, year): year
+                for year in missing
+            }
+            for future in as_completed(futures):
+                year = futures[future]
+                try:
+                    row = future.result()
+                except RuntimeError as e:
+                    errors.append(str(e))
+                    continue
+
+                stored_years.append(year)
+                stored_values.append(row)
+                # Сохраняем после каждого года, чтобы можно было продолжить после сбоя
+                self._save(latitude, longitude, stored_years, stored_values)
+                fetched += 1
+
+        return {'fetched': fetched, 'errors': errors}
+
+    def get_typical_year(self, latitude, longitude, years=10):
+        """
+        Типичный год по последним `years` годам архива в формате get_solar_irradiance.
+
+        Для каждого дня года берётся среднее по годам. Возвращает None, если архива нет.
+        """
+        path = self._path(latitude, longitude)
+        if not path.exists():
+            return None
+
+        cache_key = f"climatology_{self.api_client.CACHE_VERSION}_{latitude}_{longitude}_{years}_{path.stat().st_mtime_ns}"
+        cached_data = cache.get(cache_key)
+        if cached_data:
+            return cached_data
+
+        stored_years, values = self.load(latitude, longitude)
+        if not len(stored_years):
+            return None
+        stored_years, values = stored_years[-years:], values[-years:]
+
+        with warnings.catch_warnings():
+            # Дни без данных ни в одном году дают NaN (и предупреждение numpy)
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            # Типичный год — 365 дней (в високосные годы 31 декабря отбрасывается)
+            typical = np.nanmean(values[:, :365], axis=0)
+        valid_values = [float(v) for v in typical if not np.isnan(v)]
+        if not valid_values:
+            return None
+
+        processed_data = self.api_client._summarize_daily_values(valid_values, len(typical))
+        processed_data.update({
+            'source': 'NASA POWER API (типичный год)',
+            'latitude': latitude,
+            'longitude': longitude,
+            'period': {
+                'start': f"{int(stored_years[0])}-01-01",
+                'end': f"{int(stored_years[-1])}-12-31",
+                'years': len(stored_years),
+            },
+            'api_status': 'climatology',
+            # Годы x дни (NaN — пропуски) для Monte Carlo: межгодовой разброс погоды
+            'daily_by_year': np.asarray(values[:, :365], dtype=np.float32),
+        })
+
+        cache.set(cache_key, processed_data, 60 * 60 * 24)
+        return processed_data
+
+    def load_regional(self):
+        """
+        Региональная климатология: (boxes, latitudes, longitudes, radiation) или None.
+
+        radiation — многолетняя средняя дневная радиация точки (кВт·ч/м²/день),
+        boxes — уже загруженные прямоугольники (для докачки).
+        """
+        path = self._regional_path()
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            return data['boxes'], data['latitudes'], data['longitudes'], data['radiation']
+
+    def _save_regional(self, boxes, points):
+        """Атомарно записывает региональную климатологию; points — {(lat, lon): радиация}."""
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        path = self._regional_path()
+        tmp_path = path.with_suffix('.tmp')
+        coordinates = np.array(sorted(points), dtype=np.float32).reshape(-1, 2)
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, boxes=np.asarray(sorted(boxes), dtype=np.float32).reshape(-1, 4),
+                                latitudes=coordinates[:, 0], longitudes=coordinates[:, 1],
+                                radiation=np.array([points[key] for key in sorted(points)], dtype=np.float32))
+        os.replace(tmp_path, path)
+
+    def _fetch_box(self, box):
+        """Скачивает многолетние средние ALLSKY_SFC_SW_DWN по прямоугольнику: [(lat, lon, радиация)]."""
+        lat_min, lat_max, lon_min, lon_max = box
+        params = {
+            'parameters': 'ALLSKY_SFC_SW_DWN',
+            'community': 'RE',
+            'latitude-min': lat_min,
+            'latitude-max': lat_max,
+            'longitude-min': lon_min,
+            'longitude-max': lon_max,
+            'format': 'JSON'
+        }
+
+        last_error = None
+        for attempt in range(self.retries):
+            try:
+                with stage('upstream'):
+                    response = requests.get(self.REGIONAL_API_URL, params=params, timeout=self.timeout)
+                if response.status_code == 200:
+                    return self._parse_regional(response.json())
+                last_error = f"HTTP {response.status_code}"
+            except (requests.exceptions.RequestException, KeyError, ValueError, TypeError) as e:
+                last_error = str(e)
+
+            if attempt + 1 < self.retries:
+                time.sleep(2 ** attempt)
+
+        raise RuntimeError(f"не удалось загрузить прямоугольник {box}: {last_error}")
+
+    def _parse_regional(self, nasa_data):
+        """GeoJSON ответа NASA -> [(lat, lon, годовая средняя дневная радиация)]."""
+        points = []
+        for feature in nasa_data['features']:
+            longitude, latitude = feature['geometry']['coordinates'][:2]
+            value = feature['properties']['parameter']['ALLSKY_SFC_SW_DWN']['ANN']
+            if value is None or value <= 0 or value == self.NASA_FILL_VALUE:
+                continue
+            points.append((round(float(latitude), 4), round(float(longitude), 4), float(value)))
+        return points
+
+    def update_regional(self, lat_range, lon_range):
+        """
+        Докачивает региональную климатологию по области (один запрос на прямоугольник).
+
+        Нужна для точек без собственного архива (узлы карты окупаемости): вся
+        область покрывается десятками запросов вместо запроса на каждую точку.
+        Возвращает словарь с количеством загруженных прямоугольников и ошибками.
+        """
+        stored = self.load_regional()
+        boxes, points = set(), {}
+        if stored is not None:
+            boxes = {tuple(round(float(v), 4) for v in box) for box in stored[0]}
+            points = {(round(float(lat), 4), round(float(lon), 4)): float(value)
+                      for lat, lon, value in zip(*stored[1:])}
+
+        missing = [box for box in regional_boxes(lat_range, lon_range)
+                   if tuple(round(v, 4) for v in box) not in boxes]
+        if not missing:
+            return {'fetched': 0, 'points': len(points), 'errors': []}
+
+        print(f"[Climatology] Региональная климатология: загружаем {len(missing)} прямоугольников")
+
+        fetched, errors = 0, []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._fetch_box, box): box for box in missing}
+            for future in as_completed(futures):
+                try:
+                    rows = future.result()
+                except RuntimeError as e:
+                    errors.append(str(e))
+                    continue
+
+                boxes.add(tuple(round(v, 4) for v in futures[future]))
+                points.update({(lat, lon): value for lat, lon, value in rows})
+                # Сохраняем после каждого прямоугольника, чтобы можно было продолжить после сбоя
+                self._save_regional(boxes, points)
+                fetched += 1
+
+        return {'fetched': fetched, 'points': len(points), 'errors': errors}
+
+    def reference_points(self, years=10):
+        """
+        Все точки с измеренной радиацией: архивы точек (типичный год) и региональная климатология.
+
+        Возвращает массивы (latitudes, longitudes, radiation), radiation — средняя
+        дневная радиация, кВт·ч/м²/день. Пустые массивы, если данных нет.
+        """
+        rows = []
+        stored = self.load_regional()
+        if stored is not None:
+            rows.extend(zip(*(np.asarray(column, dtype=float) for column in stored[1:])))
+
+        if self.data_dir.exists():
+            for path in self.data_dir.glob('*_*.npz'):
+                try:
+                    latitude, longitude = (float(part) for part in path.stem.split('_'))
+                except ValueError:
+                    continue
+                data = self.get_typical_year(latitude, longitude, years=years)
+                if data is not None:
+                    rows.append((latitude, longitude, data['avg_daily_radiation_kwh_m2']))
+
+        points = np.array(rows, dtype=float).reshape(-1, 3)
+        return points[:, 0], points[:, 1], points[:, 2]
@@ -0,0 +1,247 @@
+import contextlib
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .api_client import EnergyDataClient
+from .calculator import SolarROICalculator
+from .climatology import ClimatologyStore
+
+DEFAULT_HEATMAP = {
+    # Границы и шаг сетки, градусы
+    'LAT_RANGE': (41.0, 78.0),
+    'LON_RANGE': (19.0, 180.0),
+    'STEP': 0.5,
+    # Размер тайла, ячеек сетки
+    'TILE_SIZE': 32,
+    # Эталонная система, для которой строится карта окупаемости
+    'PANEL_POWER_W': 400,
+    'PANEL_EFFICIENCY': 0.21,
+    'PANEL_PRICE': 25000,
+    'PANEL_COUNT': 10,
+    'MONTHLY_CONSUMPTION': 300,
+    # Узел берёт радиацию у опорных точек (архивы и региональная климатология NASA)
+    # не дальше этого радиуса, км; дальше — fallback-модель
+    'INTERPOLATION_RADIUS_KM': 150,
+    # Сколько ближайших опорных точек усредняется (обратные квадраты расстояний)
+    'INTERPOLATION_NEIGHBOURS': 4,
+    # Карта не строится, если fallback-моделью заполнено больше этой доли узлов
+    'MAX_FALLBACK_SHARE': 0.5,
+    'DIR': None,
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def heatmap_settings():
+    config = dict(DEFAULT_HEATMAP)
+    config.update(getattr(settings, 'HEATMAP', {}))
+    config['DIR'] = Path(config['DIR'] or settings.BASE_DIR / 'heatmap')
+    return config
+
+
+def grid_axes(config):
+    """Широты (сверху вниз) и долготы узлов сетки."""
+    step = config['STEP']
+    lat_min, lat_max = config['LAT_RANGE']
+    lon_min, lon_max = config['LON_RANGE']
+    latitudes = np.round(np.arange(lat_max, lat_min - step / 2, -step), 4)
+    longitudes = np.round(np.arange(lon_min, lon_max + step / 2, step), 4)
+    return latitudes, longitudes
+
+
+def _interpolated_radiation(latitudes, longitudes, points, radius_km, neighbours, chunk=512):
+    """
+    Средняя дневная радиация в узлах сетки по опорным точкам (обратные квадраты расстояний).
+
+    Берутся до neighbours ближайших точек в радиусе radius_km; узел, совпадающий
+    с опорной точкой, получает её значение. NaN — опорных точек в радиусе нет.
+    """
+    point_lat, point_lon, radiation = (np.radians(points[0]), np.radians(points[1]), points[2])
+    lat = np.radians(np.repeat(latitudes, len(longitudes)))
+    lon = np.radians(np.tile(longitudes, len(latitudes)))
+    neighbours = min(neighbours, len(radiation))
+
+    result = np.full(len(lat), np.nan)
+    for start in range(0, len(lat), chunk):
+        part = slice(start, start + chunk)
+        cos_angle = (np.sin(lat[part, None]) * np.sin(point_lat)
+                     + np.cos(lat[part, None]) * np.cos(point_lat) * np.cos(lon[part, None] - point_lon))
+        distance = EARTH_RADIUS_KM * np.arccos(np.clip(cos_angle, -1.0, 1.0))
+
+        nearest = np.argpartition(distance, neighbours - 1, axis=1)[:, :neighbours]
+        near_distance = np.take_along_axis(distance, nearest, axis=1)
+        inside = near_distance <= radius_km
+        # До 1 км — та же точка; ограничиваем снизу, чтобы вес не был бесконечным
+        weights = np.where(inside, 1.0 / np.maximum(near_distance, 1.0) ** 2, 0.0)
+        total = weights.sum(axis=1)
+        result[part] = np.divide((weights * radiation[nearest]).sum(axis=1), total,
+                                 out=np.full(len(total), np.nan), where=total > 0)
+    return result.reshape(len(latitudes), len(longitudes))
+
+
+def grid_sun_hours(latitudes, longitudes, config, years):
+    """
+    Солнечные часы в узлах сетки и маска узлов, заполненных fallback-моделью.
+
+    Радиация интерполируется по опорным точкам ClimatologyStore (архивы точек
+    и региональная климатология, manage.py fetch_climatology --grid) и
+    переводится в солнечные часы так же, как в EnergyDataClient. Запросов к
+    NASA не делается — карта строится только по уже загруженным данным.
+    """
+    points = ClimatologyStore().reference_points(years=years or 10)
+    if len(points[2]):
+        radiation = _interpolated_radiation(latitudes, longitudes, points, config['INTERPOLATION_RADIUS_KM'],
+                                            config['INTERPOLATION_NEIGHBOURS'])
+    else:
+        radiation = np.full((len(latitudes), len(longitudes)), np.nan)
+    sun_hours = np.floor(radiation * 365 * EnergyDataClient.CALIBRATION_FACTOR)
+
+    fallback = np.isnan(sun_hours)
+    if fallback.any():
+        api_client = EnergyDataClient()
+        # fallback-модель зависит только от широты и печатает строку на вызов
+        with contextlib.redirect_stdout(io.StringIO()):
+            for row in np.flatnonzero(fallback.any(axis=1)):
+                hours = api_client._get_fallback_data(float(latitudes[row]), 0.0)['annual_sun_hours']
+                sun_hours[row, fallback[row]] = hours
+    return sun_hours, fallback, len(points[2])
+
+
+def _nearest_tariffs(latitudes, longitudes, regions, chunk=4096):
+    """Дневной тариф ближайшего региона (по расстоянию на сфере) для каждого узла сетки."""
+    lat = np.radians(np.repeat(latitudes, len(longitudes)))
+    lon = np.radians(np.tile(longitudes, len(latitudes)))
+    region_lat = np.radians(regions[:, 0])
+    region_lon = np.radians(regions[:, 1])
+
+    tariffs = np.empty(len(lat))
+    for start in range(0, len(lat), chunk):
+        part = slice(start, start + chunk)
+        # Косинус центрального угла: максимум = ближайший регион
+        cos_angle = (np.sin(lat[part, None]) * np.sin(region_lat)
+                     + np.cos(lat[part, None]) * np.cos(region_lat) * np.cos(lon[part, None] - region_lon))
+        tariffs[part] = regions[np.argmax(cos_angle, axis=1), 2]
+    return tariffs.reshape(len(latitudes), len(longitudes))
+
+
+def payback_grid(sun_hours, tariffs, config):
+    """Срок окупаемости эталонной системы по всей сетке (формула SolarROICalculator._compute)."""
+    total_power_kw = config['PANEL_POWER_W'] * config['PANEL_COUNT'] / 1000
+    production = total_power_kw * sun_hours * config['PANEL_EFFICIENCY']
+    effective = np.minimum(production, config['MONTHLY_CONSUMPTION'] * 12)
+    yearly_saving = effective * tariffs
+    system_cost = config['PANEL_PRICE'] * config['PANEL_COUNT'] * SolarROICalculator.INSTALLATION_FACTOR
+    return np.divide(system_cost, yearly_saving, out=np.full(yearly_saving.shape, np.nan), where=yearly_saving > 0)
+
+
+def _to_tiles(grid, tile_size):
+    """(строки, столбцы) -> (тайлы по y, тайлы по x, tile_size, tile_size), края дополняются NaN."""
+    rows, cols = grid.shape
+    tiles_y, tiles_x = -(-rows // tile_size), -(-cols // tile_size)
+    padded = np.full((tiles_y * tile_size, tiles_x * tile_size), np.nan, dtype=grid.dtype)
+    padded[:rows, :cols] = grid
+    return np.ascontiguousarray(
+        padded.reshape(tiles_y, tile_size, tiles_x, tile_size).swapaxes(1, 2)
+    )
+
+
+def build_heatmap(allow_fallback=False):
+    """
+    Строит карту окупаемости эталонной системы и сохраняет её тайлами.
+
+    Инсоляция узлов интерполируется по загруженным данным NASA, расчёт
+    окупаемости — одна векторная операция numpy по всей сетке. Если данных
+    NASA нет для большей части сетки (MAX_FALLBACK_SHARE), поднимается
+    ValueError, пока не передан allow_fallback.
+    Результат: payback.npy (тайлы float16) и meta.json; файлы заменяются
+    атомарно, так что отдача тайлов не видит полузаписанную карту.
+    """
+    from ..models import Region
+
+    config = heatmap_settings()
+    started = time.perf_counter()
+    latitudes, longitudes = grid_axes(config)
+
+    regions = np.array([
+        (latitude, longitude, float(tariff))
+        for latitude, longitude, tariff in Region.objects.exclude(latitude=None).exclude(longitude=None)
+        .values_list('latitude', 'longitude', 'tariff_day')
+    ])
+    if not len(regions):
+        raise ValueError("Нет регионов с координатами для тарифов")
+
+    sun_hours, fallback, reference_points = grid_sun_hours(
+        latitudes, longitudes, config, getattr(settings, 'NASA_CLIMATOLOGY_YEARS', 0)
+    )
+    fallback_share = float(fallback.mean())
+    if fallback_share > config['MAX_FALLBACK_SHARE'] and not allow_fallback:
+        raise ValueError(
+            f"Нет данных NASA для {fallback_share:.0%} узлов сетки (опорных точек: {reference_points}) — "
+            f"загрузите климатологию: manage.py fetch_climatology --grid"
+        )
+
+    payback = payback_grid(sun_hours, _nearest_tariffs(latitudes, longitudes, regions), config)
+    tiles = _to_tiles(payback.astype(np.float16), config['TILE_SIZE'])
+
+    meta = {
+        'version': str(time.time_ns()),
+        'lat_max': float(latitudes[0]),
+        'lon_min': float(longitudes[0]),
+        'step': config['STEP'],
+        'rows': len(latitudes),
+        'cols': len(longitudes),
+        'tile_size': config['TILE_SIZE'],
+        'tiles_y': tiles.shape[0],
+        'tiles_x': tiles.shape[1],
+        'reference_system': {
+            'panel_power_w': config['PANEL_POWER_W'],
+            'panel_efficiency': config['PANEL_EFFICIENCY'],
+            'panel_price': config['PANEL_PRICE'],
+            'panel_count': config['PANEL_COUNT'],
+            'monthly_consumption': config['MONTHLY_CONSUMPTION'],
+        },
+        'sources': {
+            'reference_points': reference_points,
+            'interpolated': int((~fallback).sum()),
+            'fallback': int(fallback.sum()),
+        },
+        'fallback_share': round(fallback_share, 3),
+        'payback_min': round(float(np.nanmin(payback)), 1),
+        'payback_max': round(float(np.nanmax(payback)), 1),
+        'build_seconds': round(time.perf_counter() - started, 2),
+    }
+
+    directory = config['DIR']
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / 'payback.npy.tmp', 'wb') as f:
+        np.save(f, tiles)
+    os.replace(directory / 'payback.npy.tmp', directory / 'payback.npy')
+    (directory / 'meta.json.tmp').write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+    os.replace(directory / 'meta.json.tmp', directory / 'meta.json')
+    return meta
+
+
+def load_meta():
+    """Метаданные построенной карты или None, если карта ещё не строилась."""
+    path = heatmap_settings()['DIR'] / 'meta.json'
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def load_tile(tile_y, tile_x):
+    """Один тайл как список строк (None — нет данных), без чтения всей карты (mmap)."""
+    path = heatmap_settings()['DIR'] / 'payback.npy'
+    if not path.exists():
+        return None
+    tiles = np.load(path, mmap_mode='r')
+    if not (0 <= tile_y < tiles.shape[0] and 0 <= tile_x < tiles.shape[1]):
+        return None
+    tile = np.round(np.asarray(tiles[tile_y, tile_x], dtype=float), 1)
+    return [[None if np.isnan(value) else value for value in row] for row in tile.tolist()]
@@ -0,0 +1,157 @@
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+# Реестр обработчиков: kind -> {'func': callable, 'staff_only': bool, 'validate': callable | None}
+_registry = {}
+
+
+def register_job(kind, staff_only=False, validate=None):
+    """
+    Регистрирует обработчик фоновой задачи.
+
+    Обработчик вызывается как func(params, progress), где progress(fraction)
+    сохраняет прогресс 0..1, и должен вернуть JSON-сериализуемый результат.
+    validate(params) — проверка параметров до постановки в очередь: возвращает
+    словарь ошибок в формате API или None.
+    """
+    def decorator(func):
+        _registry[kind] = {'func': func, 'staff_only': staff_only, 'validate': validate}
+        return func
+    return decorator
+
+
+def get_job_kind(kind):
+    _load_tasks()
+    return _registry.get(kind)
+
+
+def _load_tasks():
+    # Обработчики регистрируются при импорте модуля задач
+    from .. import tasks  # noqa: F401
+
+
+def enqueue(kind, params=None, user=None):
+    """Ставит задачу в очередь (строка в БД) и возвращает Job."""
+    from ..models import Job
+
+    if get_job_kind(kind) is None:
+        raise ValueError(f"Неизвестный тип задачи: {kind}")
+    return Job.objects.create(kind=kind, params=params or {}, user=user)
+
+
+def claim_next(worker):
+    """
+    Забирает самую старую задачу из очереди.
+
+    Захват — условный UPDATE по статусу, поэтому несколько воркеров не возьмут
+    одну задачу даже без SELECT ... FOR UPDATE (работает и на SQLite).
+    """
+    from ..models import Job
+
+    candidates = Job.objects.filter(status=Job.STATUS_PENDING).order_by('created_at').values_list('pk', flat=True)[:5]
+    for pk in candidates:
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_PENDING).update(
+            status=Job.STATUS_RUNNING, started_at=timezone.now(), worker=worker
+        )
+        if claimed:
+            return pk
+    return None
+
+
+def requeue_stale(max_age_seconds, exclude_worker=None):
+    """
+    Возвращает в очередь задачи, «зависшие» в running дольше max_age_seconds (упавший воркер).
+
+    exclude_worker — задачи этого воркера не трогаем: он сам следит за своими задачами.
+    """
+    from ..models import Job
+
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, started_at__lt=cutoff)
+    if exclude_worker:
+        stale = stale.exclude(worker=exclude_worker)
+    return stale.update(status=Job.STATUS_PENDING, started_at=None, worker='', progress=0)
+
+
+def requeue_job(job_id):
+    """Возвращает в очередь задачу, которую воркер забрал, но не успел запустить."""
+    from ..models import Job
+
+    return Job.objects.filter(pk=job_id, status=Job.STATUS_RUNNING).update(
+        status=Job.STATUS_PENDING, started_at=None, worker='', progress=0
+    )
+
+
+def fail_job(job_id, error):
+    """Помечает задачу в running проваленной (процесс пула упал, не записав результат)."""
+    from ..models import Job
+
+    return Job.objects.filter(pk=job_id, status=Job.STATUS_RUNNING).update(
+        status=Job.STATUS_FAILED, error=error, finished_at=timezone.now()
+    )
+
+
+def setup_worker_process():
+    """Инициализация процесса пула runworker: настройка Django в новом интерпретаторе."""
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    """Выполняет задачу (вызывается в процессе пула runworker)."""
+    from ..models import Job
+
+    close_old_connections()
+    job = Job.objects.get(pk=job_id)
+    handler = get_job_kind(job.kind)
+
+    def progress(fraction):
+        Job.objects.filter(pk=job_id).update(progress=round(min(max(fraction, 0.0), 1.0), 4))
+
+    try:
+        if handler is None:
+            raise ValueError(f"Неизвестный тип задачи: {job.kind}")
+        result = handler['func'](job.params, progress)
+    except Exception as e:
+        print(f"[Jobs] Задача {job_id} ({job.kind}) завершилась ошибкой: {e}")
+        Job.objects.filter(pk=job_id).update(
+            status=Job.STATUS_FAILED, error=traceback.format_exc(), finished_at=timezone.now()
+        )
+        return Job.STATUS_FAILED
+
+    Job.objects.filter(pk=job_id).update(
+        status=Job.STATUS_DONE, result=result, progress=1, finished_at=timezone.now()
+    )
+    return Job.STATUS_DONE
+
+
+def queue_stats(window_minutes=60):
+    """Глубина очереди и задержки: ожидание в очереди и время выполнения за последний период."""
+    from ..models import Job
+
+    now = timezone.now()
+    by_status = dict(Job.objects.values_list('status').annotate(count=Count('pk')).order_by())
+    oldest_pending = Job.objects.filter(status=Job.STATUS_PENDING).aggregate(oldest=Min('created_at'))['oldest']
+
+    recent = Job.objects.filter(finished_at__gte=now - timedelta(minutes=window_minutes))
+    timings = recent.aggregate(
+        avg_wait=Avg(F('started_at') - F('created_at')),
+        avg_run=Avg(F('finished_at') - F('started_at')),
+    )
+
+    def seconds(value):
+        return round(value.total_seconds(), 3) if value is not None else None
+
+    return {
+        'depth': by_status.get(Job.STATUS_PENDING, 0),
+        'by_status': {status: by_status.get(status, 0) for status, _ in Job.STATUS_CHOICES},
+        'oldest_pending_age_seconds': seconds(now - oldest_pending) if oldest_pending else None,
+        'window_minutes': window_minutes,
+        'finished_in_window': recent.count(),
+        'avg_wait_seconds': seconds(timings['avg_wait']),
+        'avg_run_seconds': seconds(timings['avg_run']),
+    }
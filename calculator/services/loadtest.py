@@ -0,0 +1,158 @@
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Смесь трафика по умолчанию: доля запросов каждого типа
+DEFAULT_MIX = {
+    'home': 30,
+    'calculate_form': 20,
+    'calculate': 30,
+    'history': 10,
+    'login': 10,
+}
+
+
+class VirtualUser:
+    """Виртуальный пользователь: своя сессия (cookies, CSRF), вход под тестовой учётной записью."""
+
+    def __init__(self, base_url, username, password, region_ids, panel_ids, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.region_ids = region_ids
+        self.panel_ids = panel_ids
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _get(self, path):
+        return self.session.get(self.base_url + path, timeout=self.timeout, allow_redirects=False)
+
+    def _post(self, path, data):
+        data['csrfmiddlewaretoken'] = self.session.cookies.get('csrftoken', '')
+        return self.session.post(self.base_url + path, data=data, timeout=self.timeout, allow_redirects=False,
+                                 headers={'Referer': self.base_url + path})
+
+    def login(self):
+        self._get('/login/')
+        return self._post('/login/', {'username': self.username, 'password': self.password})
+
+    def home(self):
+        return self._get('/')
+
+    def calculate_form(self):
+        return self._get('/calculate/')
+
+    def calculate(self):
+        return self._post('/calculate/', {
+            'region': random.choice(self.region_ids),
+            'panel': random.choice(self.panel_ids),
+            'panel_count': random.randint(4, 30),
+            'monthly_consumption': random.randint(150, 800),
+        })
+
+    def history(self):
+        return self._get('/history/')
+
+
+def _select_options(html, name):
+    select = re.search(rf'<select[^>]*name="{name}"[^>]*>(.*?)</select>', html, re.S)
+    if select is None:
+        return []
+    return [int(value) for value in re.findall(r'<option value="(\d+)"', select.group(1))]
+
+
+def target_catalog(base_url, timeout=30):
+    """
+    Идентификаторы регионов и панелей тестируемого сервера — из его формы расчёта.
+
+    Каталог цели может не совпадать с локальным: расчёты с чужими id
+    отвечали бы ошибкой формы и не нагружали бы приложение.
+    """
+    response = requests.get(base_url.rstrip('/') + '/calculate/', timeout=timeout)
+    response.raise_for_status()
+    return _select_options(response.text, 'region'), _select_options(response.text, 'panel')
+
+
+def run_load_test(base_url, concurrency, duration, mix, username, password, region_ids, panel_ids, timeout=30):
+    """
+    Гоняет смесь запросов concurrency виртуальными пользователями в течение duration секунд.
+
+    Возвращает (samples, elapsed), где samples — список (endpoint, latency_s, status);
+    status = None — ошибка соединения или таймаут.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        user = VirtualUser(base_url, username, password, region_ids, panel_ids, timeout)
+        user.login()
+        local = []
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = getattr(user, name)().status_code
+            except requests.exceptions.RequestException:
+                status = None
+            local.append((name, time.perf_counter() - start, status))
+        with lock:
+            samples.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - started
+
+
+def _latency_stats(latencies):
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(values.max()), 2),
+    }
+
+
+def _is_error(status):
+    # 429 — штатный отказ контроля допуска, считается отдельно от ошибок
+    return status is None or (status >= 400 and status != 429)
+
+
+def summarize(samples, elapsed):
+    """Пропускная способность и перцентили задержки: всего и по каждому endpoint."""
+    by_endpoint = {}
+    for name, latency, status in samples:
+        by_endpoint.setdefault(name, []).append((latency, status))
+
+    endpoints = {}
+    for name, rows in sorted(by_endpoint.items()):
+        endpoints[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, status in rows if _is_error(status)),
+            'rejected': sum(1 for _, status in rows if status == 429),
+            'rps': round(len(rows) / elapsed, 2),
+            **_latency_stats([latency for latency, _ in rows]),
+        }
+
+    report = {
+        'duration_s': round(elapsed, 2),
+        'requests': len(samples),
+        'errors': sum(1 for _, _, status in samples if _is_error(status)),
+        'rejected': sum(1 for _, _, status in samples if status == 429),
+        'rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'endpoints': endpoints,
+    }
+    if samples:
+        report.update(_latency_stats([latency for _, latency, _ in samples]))
+    return report
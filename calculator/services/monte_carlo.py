@@ -0,0 +1,121 @@
+import numpy as np
+
+# Сколько лет бутстрэпа собирается за раз: память на матрицы индексов и выборки
+# ограничена пакетом и не растёт с draws (без пакетов — ~440 МБ на 100k)
+BOOTSTRAP_CHUNK = 10000
+
+# Сезонные страты дневного ряда (≈ календарные месяцы): день бутстрэпа берётся
+# из своей страты, поэтому в симулированном году не бывает «лишних» зимних дней
+SEASONAL_STRATA = 12
+
+
+def _seasonal_strata(series_length, days):
+    """Страты: (начало, конец) в дневном ряду и сколько дней симулированного года из неё брать."""
+    bounds = np.linspace(0, series_length, SEASONAL_STRATA + 1).astype(int)
+    counts = np.diff(np.linspace(0, days, SEASONAL_STRATA + 1).astype(int))
+    return [(int(low), int(max(high, low + 1)), int(count))
+            for low, high, count in zip(bounds[:-1], bounds[1:], counts)]
+
+
+def _bootstrap_sun_hours(rng, draws, days, daily, daily_by_year):
+    """
+    Сумма радиации за симулированные годы пакетами по BOOTSTRAP_CHUNK лет.
+
+    С многолетним архивом (годы x дни) каждый день года берётся из случайного
+    сохранённого года — разброс отражает межгодовую изменчивость погоды. Без
+    архива дни выбираются с возвращением внутри сезонной страты дневного ряда.
+    """
+    sun_hours = np.empty(draws)
+    if daily_by_year is not None:
+        stored_years, archive_days = daily_by_year.shape
+        days = min(days, archive_days)
+        # Пропуски архива заменяем средним дня по годам (как в типичном году)
+        filled = np.where(np.isnan(daily_by_year), np.nanmean(daily_by_year, axis=0), daily_by_year)
+        filled = np.nan_to_num(filled[:, :days])
+        columns = np.arange(days)
+        for start in range(0, draws, BOOTSTRAP_CHUNK):
+            size = min(BOOTSTRAP_CHUNK, draws - start)
+            year_idx = rng.integers(0, stored_years, size=(size, days), dtype=np.int16)
+            sun_hours[start:start + size] = filled[year_idx, columns].sum(axis=1)
+        return sun_hours
+
+    strata = _seasonal_strata(daily.size, days)
+    for start in range(0, draws, BOOTSTRAP_CHUNK):
+        size = min(BOOTSTRAP_CHUNK, draws - start)
+        total = np.zeros(size)
+        for low, high, count in strata:
+            # Индексы int32 вдвое экономнее по памяти на матрице size x count
+            idx = rng.integers(low, high, size=(size, count), dtype=np.int32)
+            total += daily[idx].sum(axis=1)
+        sun_hours[start:start + size] = total
+    return sun_hours
+
+
+def _exceedance_bands(values, higher_is_better=True):
+    """
+    Перцентильные полосы в банковской нотации P-значений.
+
+    P90 — значение, которое будет достигнуто с вероятностью 90%. Для выработки
+    и экономии это 10-й перцентиль, для срока окупаемости (меньше — лучше) — 90-й.
+    """
+    low, mid, high = np.percentile(values, [10, 50, 90])
+    if not higher_is_better:
+        low, high = high, low
+    return {
+        'p10': round(float(high), 2),
+        'p50': round(float(mid), 2),
+        'p90': round(float(low), 2),
+        'mean': round(float(values.mean()), 2),
+    }
+
+
+def simulate_roi(daily_radiation, annual_sun_hours, total_power_kw, efficiency,
+                 yearly_consumption_kwh, tariff, system_cost, calibration_factor,
+                 draws=10000, tariff_sigma=0.0, price_sigma=0.0, seed=None, days=365,
+                 daily_by_year=None):
+    """
+    Векторизованный Monte Carlo расчёт окупаемости.
+
+    Каждый симулированный год собирается бутстрэпом радиации ALLSKY_SFC_SW_DWN:
+    при многолетнем архиве daily_by_year (годы x дни) — день года из случайного
+    года архива, иначе — дни дневного ряда с возвращением внутри сезонных страт.
+    Годы собираются пакетами по BOOTSTRAP_CHUNK, так что память не растёт с
+    draws. Тариф и цена системы опционально умножаются на нормальный шум с
+    относительным СКО tariff_sigma и price_sigma. Если дневного ряда нет
+    (fallback-данные), выработка берётся детерминированной из annual_sun_hours.
+    """
+    rng = np.random.default_rng(seed)
+    daily = np.asarray(daily_radiation if daily_radiation else [], dtype=np.float64)
+    if daily_by_year is not None:
+        daily_by_year = np.asarray(daily_by_year, dtype=np.float64)
+        if daily_by_year.ndim != 2 or len(daily_by_year) < 2:
+            daily_by_year = None
+
+    if daily_by_year is not None or daily.size:
+        sun_hours = _bootstrap_sun_hours(rng, draws, days, daily, daily_by_year) * calibration_factor
+    else:
+        sun_hours = np.full(draws, float(annual_sun_hours))
+
+    production = total_power_kw * sun_hours * efficiency
+    effective = np.minimum(production, yearly_consumption_kwh)
+
+    tariffs = np.full(draws, float(tariff))
+    if tariff_sigma:
+        tariffs *= np.clip(rng.normal(1.0, tariff_sigma, draws), 0.01, None)
+
+    costs = np.full(draws, float(system_cost))
+    if price_sigma:
+        costs *= np.clip(rng.normal(1.0, price_sigma, draws), 0.01, None)
+
+    savings = effective * tariffs
+    # Как и в детерминированном расчёте: без экономии срок окупаемости = 0
+    payback = np.divide(costs, savings, out=np.zeros(draws), where=savings > 0)
+
+    return {
+        'draws': draws,
+        'bootstrap_days': int(daily.size),
+        'bootstrap_years': 0 if daily_by_year is None else len(daily_by_year),
+        'yearly_production_kwh': _exceedance_bands(production),
+        'yearly_saving': _exceedance_bands(savings),
+        'payback_years': _exceedance_bands(payback, higher_is_better=False),
+    }
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_PROFILING = {
+    'ENABLED': False,
+    # Доля случайно профилируемых запросов (0..1)
+    'SAMPLE_RATE': 0.0,
+    # Заголовок, по которому персонал включает профилирование конкретного запроса
+    'HEADER': 'X-Profile',
+    # Интервал снятия стека, с
+    'INTERVAL': 0.005,
+    'DIR': None,
+    # Сколько последних профилей хранить
+    'MAX_FILES': 500,
+}
+
+
+def profiling_settings():
+    config = dict(DEFAULT_PROFILING)
+    config.update(getattr(settings, 'PROFILING', {}))
+    config['DIR'] = Path(config['DIR'] or settings.BASE_DIR / 'profiles')
+    return config
+
+
+class StackSampler:
+    """
+    Сэмплирующий профайлер одного потока.
+
+    Фоновый поток раз в interval снимает стек профилируемого потока через
+    sys._current_frames() и копит счётчики в формате folded stacks
+    ("корень;...;лист N") — его понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.counts.most_common()) + '\n'
+
+
+class QueryRecorder:
+    """Обёртка для connection.execute_wrapper: считает SQL-запросы и их время."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000))
+
+    def summary(self, top=10):
+        slowest = sorted(self.queries, key=lambda query: query[1], reverse=True)[:top]
+        return {
+            'sql_count': len(self.queries),
+            'sql_time_ms': round(sum(duration for _, duration in self.queries), 3),
+            'slowest_queries': [{'sql': sql[:500], 'ms': round(duration, 3)} for sql, duration in slowest],
+        }
+
+
+def save_profile(meta, folded):
+    """Сохраняет профиль запроса: <id>.json (метаданные, SQL) и <id>.folded (стеки)."""
+    config = profiling_settings()
+    directory = config['DIR']
+    directory.mkdir(parents=True, exist_ok=True)
+
+    profile_id = f"{int(time.time() * 1000)}_{threading.get_ident()}"
+    meta['id'] = profile_id
+    (directory / f"{profile_id}.folded").write_text(folded, encoding='utf-8')
+    (directory / f"{profile_id}.json").write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+
+    # Ротация: удаляем самые старые профили сверх лимита
+    metas = sorted(directory.glob('*.json'))
+    for old in metas[:max(0, len(metas) - config['MAX_FILES'])]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.folded').unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles(limit=100):
+    """Сохранённые профили, самые медленные первыми."""
+    directory = profiling_settings()['DIR']
+    if not directory.exists():
+        return []
+
+    profiles = []
+    for path in directory.glob('*.json'):
+        try:
+            profiles.append(json.loads(path.read_text(encoding='utf-8')))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda meta: meta.get('duration_ms', 0), reverse=True)
+    return profiles[:limit]
+
+
+def profile_path(profile_id, suffix):
+    """Путь к файлу профиля (id проверяется, чтобы не выйти за пределы каталога)."""
+    if not profile_id.replace('_', '').isdigit():
+        return None
+    path = profiling_settings()['DIR'] / f"{profile_id}{suffix}"
+    return path if path.exists() else None
@@ -0,0 +1,173 @@
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Least, Round
+from django.utils import timezone
+
+from .calculator import SolarROICalculator
+
+
+def _panel_field(name):
+    from ..models import SolarPanel
+
+    return Subquery(SolarPanel.objects.filter(pk=OuterRef('panel_id')).values(name)[:1])
+
+
+def _money_expressions(production=None):
+    """
+    Денежные поля расчёта как SQL-выражения (формула SolarROICalculator._compute).
+
+    Тариф и цена берутся из каталога подзапросом по первичному ключу, экономия —
+    по выработке production (по умолчанию сохранённой: от тарифа и цены она не зависит).
+    """
+    from ..models import Region
+
+    money = DecimalField(max_digits=14, decimal_places=4)
+    tariff = Subquery(Region.objects.filter(pk=OuterRef('region_id')).values('tariff_day')[:1])
+    price = _panel_field('price')
+
+    production = F('yearly_production_kwh') if production is None else production
+    effective = Least(production, F('monthly_consumption') * 12, output_field=FloatField())
+    total_cost = Cast(price * F('panel_count') * Value(SolarROICalculator.INSTALLATION_FACTOR), money)
+    yearly_saving = Cast(effective * tariff, money)
+    return {'total_cost': Round(total_cost, 2), 'yearly_saving': Round(yearly_saving, 2)}
+
+
+def recompute_for_catalog_change(region_ids=(), panel_ids=(), batch_size=20000, progress=None):
+    """
+    Пересчитывает денежные поля расчётов после смены Region.tariff_day или SolarPanel.price.
+
+    Затрагиваются только расчёты изменившихся регионов и панелей. Пересчёт
+    множественный: пакеты по первичному ключу (keyset) обновляются UPDATE с
+    выражениями, которые вычисляет сама БД, без загрузки строк в Python.
+    Каждый пакет — отдельная короткая транзакция, поэтому запись не блокирует
+    веб-запросы надолго. Возвращает {'checked', 'updated'}.
+    """
+    from ..models import Calculation
+
+    region_ids, panel_ids = list(region_ids), list(panel_ids)
+    if not region_ids and not panel_ids:
+        return {'checked': 0, 'updated': 0}
+
+    affected = Calculation.objects.filter(
+        Q(region_id__in=region_ids) | Q(panel_id__in=panel_ids),
+        yearly_production_kwh__isnull=False,
+    )
+    return _update_in_chunks(affected, _money_expressions(), batch_size, progress)
+
+
+def _sun_hours_expression(region_ids, workers=8):
+    """
+    Годовые солнечные часы по региону расчёта как SQL-выражение CASE.
+
+    Данные инсоляции запрашиваются один раз на регион (NASA POWER или
+    климатология — как в SolarROICalculator.get_solar_data), регионы — параллельно.
+    """
+    from ..models import Region
+
+    def sun_hours(region):
+        solar_data = SolarROICalculator(
+            panel=None, panel_count=0, region=region, monthly_consumption=0
+        ).get_solar_data()
+        return When(region_id=region.pk, then=Value(float(solar_data['annual_sun_hours'])))
+
+    regions = list(Region.objects.filter(pk__in=region_ids))
+    # Клиент NASA печатает строку на каждый запрос — для тысяч регионов это шум в логе воркера
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=workers) as executor:
+        whens = list(executor.map(sun_hours, regions))
+    return Case(*whens, default=Value(0.0), output_field=FloatField())
+
+
+def recompute_calculations(queryset, batch_size=20000, progress=None):
+    """
+    Полностью пересчитывает результаты расчётов queryset по текущим тарифам, ценам и инсоляции.
+
+    Инсоляция запрашивается один раз на регион и подставляется в UPDATE
+    выражением CASE по региону; мощность, КПД и цена панели берутся
+    подзапросами. Вся арифметика выполняется в БД пакетами по первичному
+    ключу, без объектов калькулятора на строку. Возвращает {'checked', 'updated'}.
+    """
+    region_ids = list(queryset.order_by().values_list('region_id', flat=True).distinct())
+    if not region_ids:
+        return {'checked': 0, 'updated': 0}
+
+    power_kw = Cast(_panel_field('power_w'), FloatField()) * F('panel_count') / Value(1000.0)
+    production = power_kw * _sun_hours_expression(region_ids) * _panel_field('efficiency')
+    values = {
+        'system_power_kw': Round(power_kw, 2, output_field=FloatField()),
+        'yearly_production_kwh': Round(production, 0, output_field=FloatField()),
+        'co2_saved_kg': Round(production * Value(0.5), 0, output_field=FloatField()),
+        **_money_expressions(production),
+    }
+    return _update_in_chunks(queryset, values, batch_size, progress)
+
+
+def _update_in_chunks(queryset, values, batch_size, progress=None):
+    """
+    UPDATE queryset пакетами по первичному ключу (keyset) с выражениями values,
+    затем окупаемость по уже обновлённым стоимости и экономии.
+
+    Каждый пакет — отдельная короткая транзакция, поэтому запись не блокирует
+    веб-запросы надолго. Возвращает {'checked', 'updated'}.
+    """
+    affected = queryset.order_by('pk')
+    total = affected.count()
+    payback = Case(
+        # Cast к float: SQLite хранит «круглые» Decimal как целые, деление было бы целочисленным
+        When(yearly_saving__gt=0, then=Round(Cast('total_cost', FloatField()) / F('yearly_saving'), 1,
+                                             output_field=FloatField())),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+    checked = 0
+    last_pk = 0
+    while checked < total:
+        # Верхняя граница пакета: batch_size-й затронутый pk после last_pk
+        upper = affected.filter(pk__gt=last_pk).values_list('pk', flat=True)[batch_size - 1:batch_size].first()
+        chunk = affected.filter(pk__gt=last_pk)
+        if upper is not None:
+            chunk = chunk.filter(pk__lte=upper)
+
+        with transaction.atomic():
+            updated = chunk.update(updated_at=timezone.now(), **values)
+            chunk.update(payback_years=payback)
+
+        checked += updated
+        if upper is None:
+            break
+        last_pk = upper
+        if progress is not None:
+            progress(checked / total)
+
+    return {'checked': total, 'updated': checked}
+
+
+def calculations_for_params(params):
+    """
+    Расчёты для фоновой задачи пересчёта из админки.
+
+    params = {"ids": [...]} для отмеченных строк или {"filters": {...}, "search": "..."}
+    для «выбрать все» — фильтры и поиск списка CalculationAdmin. Принимаются
+    только фильтры по полям list_filter.
+    """
+    from django.contrib import admin
+    from ..models import Calculation
+
+    if 'ids' in params:
+        return Calculation.objects.filter(pk__in=params['ids'])
+
+    model_admin = admin.site.get_model_admin(Calculation)
+    lookups = {
+        lookup: value for lookup, value in (params.get('filters') or {}).items()
+        if lookup.split('__')[0] in model_admin.list_filter
+    }
+    queryset = Calculation.objects.filter(**lookups)
+    if params.get('search'):
+        queryset, may_have_duplicates = model_admin.get_search_results(None, queryset, params['search'])
+        if may_have_duplicates:
+            queryset = queryset.distinct()
+    return queryset
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Параметры, которые варьируются в анализе чувствительности
+PARAMETERS = (
+    ('tariff', 'Тариф на электроэнергию'),
+    ('price', 'Цена панели'),
+    ('installation_factor', 'Коэффициент монтажа'),
+    ('efficiency', 'КПД панели'),
+    ('sun_hours', 'Солнечные часы'),
+    ('consumption', 'Потребление'),
+)
+
+DEFAULT_STEPS = (-0.2, -0.1, 0.1, 0.2)
+
+
+def _evaluate(inputs, total_power_kw, panel_count):
+    """Векторизованный расчёт экономии и окупаемости для матрицы входов (строка — сценарий)."""
+    tariff, price, installation_factor, efficiency, sun_hours, consumption = inputs.T
+
+    production = total_power_kw * sun_hours * efficiency
+    effective = np.minimum(production, consumption * 12)
+    savings = effective * tariff
+    cost = price * panel_count * installation_factor
+    # Как и в основном расчёте: без экономии срок окупаемости = 0
+    payback = np.divide(cost, savings, out=np.zeros(len(savings)), where=savings > 0)
+    return savings, payback
+
+
+def _elasticity(value_low, value_high, base_value, step_low, step_high):
+    """Дуговая эластичность: относительное изменение результата на единицу относительного изменения параметра."""
+    if not base_value or step_high == step_low:
+        return 0.0
+    return round(float((value_high - value_low) / base_value / (step_high - step_low)), 3)
+
+
+def sensitivity_analysis(tariff, price, installation_factor, efficiency, sun_hours,
+                         monthly_consumption, total_power_kw, panel_count, steps=DEFAULT_STEPS):
+    """
+    Анализ чувствительности (данные для tornado-диаграммы).
+
+    Каждый параметр по отдельности изменяется на относительные шаги steps
+    (например, -0.2 = -20%), все сценарии считаются одной матрицей numpy.
+    Параметры в ответе отсортированы по размаху срока окупаемости.
+    """
+    steps = np.asarray(sorted(steps), dtype=np.float64)
+    base = np.array([tariff, price, installation_factor, efficiency, sun_hours, monthly_consumption],
+                    dtype=np.float64)
+    n_params, n_steps = len(PARAMETERS), len(steps)
+
+    # Первая строка — базовый сценарий, далее по n_steps строк на каждый параметр
+    multipliers = np.ones((1 + n_params * n_steps, n_params))
+    for i in range(n_params):
+        multipliers[1 + i * n_steps:1 + (i + 1) * n_steps, i] += steps
+
+    savings, payback = _evaluate(base * multipliers, total_power_kw, panel_count)
+    base_saving, base_payback = savings[0], payback[0]
+
+    parameters = []
+    for i, (name, label) in enumerate(PARAMETERS):
+        rows = slice(1 + i * n_steps, 1 + (i + 1) * n_steps)
+        param_savings, param_payback = savings[rows], payback[rows]
+
+        parameters.append({
+            'name': name,
+            'label': label,
+            'base_value': round(float(base[i]), 4),
+            'yearly_saving': [round(float(v), 2) for v in param_savings],
+            'payback_years': [round(float(v), 2) for v in param_payback],
+            'payback_low': round(float(param_payback.min()), 2),
+            'payback_high': round(float(param_payback.max()), 2),
+            'swing': round(float(param_payback.max() - param_payback.min()), 2),
+            'elasticity_payback': _elasticity(param_payback[0], param_payback[-1], base_payback,
+                                              steps[0], steps[-1]),
+            'elasticity_saving': _elasticity(param_savings[0], param_savings[-1], base_saving,
+                                             steps[0], steps[-1]),
+        })
+
+    parameters.sort(key=lambda p: p['swing'], reverse=True)
+
+    return {
+        'steps': [round(float(s), 4) for s in steps],
+        'base': {
+            'yearly_saving': round(float(base_saving), 2),
+            'payback_years': round(float(base_payback), 2),
+        },
+        'parameters': parameters,
+    }
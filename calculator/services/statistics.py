@@ -0,0 +1,82 @@
+from django.db.models import Count, Sum
+
+from .catalog import catalog_cache
+
+
+def _combine_avg(hot_sum, hot_count, archived_sum, archived_count):
+    count = (hot_count or 0) + (archived_count or 0)
+    if not count:
+        return None
+    return (float(hot_sum or 0) + float(archived_sum or 0)) / count
+
+
+def site_statistics(popular_limit=5):
+    """
+    Статистика для главной: «горячая» таблица расчётов плюс агрегаты архива.
+
+    По каждой таблице — один агрегирующий запрос; популярные панели берутся
+    из кеша каталога без дополнительного запроса.
+    """
+    from ..models import Calculation, CalculationRollup
+
+    hot = Calculation.objects.aggregate(
+        count=Count('pk'),
+        payback_sum=Sum('payback_years'),
+        payback_count=Count('payback_years'),
+        co2_sum=Sum('co2_saved_kg'),
+    )
+    archived = CalculationRollup.objects.aggregate(
+        count=Sum('calculations'),
+        payback_sum=Sum('payback_sum'),
+        payback_count=Sum('payback_count'),
+        co2_sum=Sum('co2_saved_sum'),
+    )
+
+    panel_counts = dict(Calculation.objects.values_list('panel').annotate(n=Count('pk')).order_by())
+    for panel_id, n in CalculationRollup.objects.values_list('panel').annotate(n=Sum('calculations')).order_by():
+        panel_counts[panel_id] = panel_counts.get(panel_id, 0) + n
+
+    # Как и раньше, панели без расчётов тоже попадают в список, если популярных меньше popular_limit
+    panels = sorted(catalog_cache.panels(), key=lambda panel: panel_counts.get(panel.pk, 0), reverse=True)
+
+    return {
+        'total_calculations': hot['count'] + (archived['count'] or 0),
+        'avg_payback': _combine_avg(hot['payback_sum'], hot['payback_count'],
+                                    archived['payback_sum'], archived['payback_count']),
+        'total_co2_saved': float(hot['co2_sum'] or 0) + float(archived['co2_sum'] or 0),
+        'popular_panels': panels[:popular_limit],
+    }
+
+
+def user_statistics(user):
+    """Итоги по истории пользователя: его текущие расчёты плюс заархивированные."""
+    from ..models import Calculation, UserCalculationRollup
+
+    hot = Calculation.objects.filter(user=user).aggregate(
+        total_investment=Sum('total_cost'),
+        total_saving_per_year=Sum('yearly_saving'),
+        payback_sum=Sum('payback_years'),
+        payback_count=Count('payback_years'),
+    )
+    archived = UserCalculationRollup.objects.filter(user=user).aggregate(
+        calculations=Sum('calculations'),
+        total_investment=Sum('total_cost_sum'),
+        total_saving_per_year=Sum('yearly_saving_sum'),
+        payback_sum=Sum('payback_sum'),
+        payback_count=Sum('payback_count'),
+    )
+
+    if not archived['calculations']:
+        total_investment = hot['total_investment']
+        total_saving_per_year = hot['total_saving_per_year']
+    else:
+        total_investment = float(hot['total_investment'] or 0) + archived['total_investment']
+        total_saving_per_year = float(hot['total_saving_per_year'] or 0) + archived['total_saving_per_year']
+
+    return {
+        'total_investment': total_investment,
+        'total_saving_per_year': total_saving_per_year,
+        'avg_payback': _combine_avg(hot['payback_sum'], hot['payback_count'],
+                                    archived['payback_sum'], archived['payback_count']),
+        'archived_calculations': archived['calculations'] or 0,
+    }
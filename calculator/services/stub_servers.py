@@ -0,0 +1,124 @@
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubServer:
+    """
+    Локальный HTTP-стаб внешнего API для проверок и нагрузочных тестов.
+
+    handler(path, query) возвращает (status, payload); payload сериализуется в JSON.
+    latency — задержка ответа в секундах, error_rate — доля ответов с HTTP 503.
+    Используется как контекстный менеджер: сервер поднимается в фоновом потоке
+    на свободном порту, адрес доступен в атрибуте url.
+    """
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, host='127.0.0.1', port=0):
+        self.handler = handler
+        self.latency = latency
+        self.error_rate = error_rate
+        self._server = ThreadingHTTPServer((host, port), self._make_request_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_request_handler(self):
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if stub.error_rate and random.random() < stub.error_rate:
+                    status, payload = 503, {'error': 'stub error'}
+                else:
+                    parsed = urlparse(self.path)
+                    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                    status, payload = stub.handler(parsed.path, query)
+
+                body = json.dumps(payload).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Клиент не дождался ответа (таймаут) — это ожидаемо
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return RequestHandler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def nasa_power_handler(path, query):
+    """
+    Обработчик стаба NASA POWER: отвечает в формате daily/point с рядом ALLSKY_SFC_SW_DWN.
+
+    Значения — синусоида по дням года (зима/лето), зависящая от широты, без сети и лимитов.
+    Запрос climatology/regional получает многолетние средние по узлам 1° в прямоугольнике.
+    """
+    if 'regional' in path:
+        return _nasa_regional(query)
+    try:
+        latitude = float(query.get('latitude', 55.0))
+        start = datetime.strptime(query['start'], '%Y%m%d')
+        end = datetime.strptime(query['end'], '%Y%m%d')
+    except (KeyError, ValueError):
+        return 422, {'messages': ['stub: неверные параметры']}
+
+    mean = max(0.5, 5.5 - abs(latitude) / 20)
+    daily = {}
+    day = start
+    while day <= end:
+        season = math.cos(2 * math.pi * (day.timetuple().tm_yday - 172) / 365)
+        daily[day.strftime('%Y%m%d')] = round(max(0.1, mean * (1 + 0.6 * season)), 2)
+        day += timedelta(days=1)
+
+    return 200, {'properties': {'parameter': {'ALLSKY_SFC_SW_DWN': daily}}}
+
+
+def _nasa_regional(query):
+    try:
+        lat_min, lat_max = float(query['latitude-min']), float(query['latitude-max'])
+        lon_min, lon_max = float(query['longitude-min']), float(query['longitude-max'])
+    except (KeyError, ValueError):
+        return 422, {'messages': ['stub: неверные параметры']}
+
+    features = []
+    for latitude in range(math.ceil(lat_min), math.floor(lat_max) + 1):
+        for longitude in range(math.ceil(lon_min), math.floor(lon_max) + 1):
+            annual = round(max(0.5, 5.5 - abs(latitude) / 20), 2)
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [longitude + 0.5, latitude + 0.5, 100.0]},
+                'properties': {'parameter': {'ALLSKY_SFC_SW_DWN': {'ANN': annual}}},
+            })
+    return 200, {'type': 'FeatureCollection', 'features': features}
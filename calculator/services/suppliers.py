@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from decimal import Decimal
+from statistics import median
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog import catalog_cache
+
+
+class SupplierPriceAggregator:
+    """
+    Агрегация актуальных цен панелей через API поставщиков (согласно ТЗ).
+
+    Запросы ко всем поставщикам идут параллельно. У каждого поставщика свой
+    таймаут, у всего опроса — общий дедлайн: кто не успел, просто не попадает
+    в результат. Успешные ответы кешируются, цена панели — медиана по
+    ответившим поставщикам. Расчёты читают цену из БД, поэтому медленный
+    поставщик на них не влияет.
+
+    Формат ответа поставщика: {"prices": [{"name": "<название панели>", "price": 21000.0}, ...]}
+    """
+
+    CACHE_PREFIX = "supplier_prices"
+
+    def __init__(self, suppliers=None, deadline=None, cache_seconds=None):
+        self.suppliers = suppliers if suppliers is not None else getattr(settings, 'PRICE_SUPPLIERS', [])
+        self.deadline = deadline or getattr(settings, 'PRICE_SUPPLIER_DEADLINE', 5)
+        self.cache_seconds = cache_seconds if cache_seconds is not None else getattr(settings, 'PRICE_CACHE_SECONDS', 3600)
+
+    def _cache_key(self, supplier):
+        return f"{self.CACHE_PREFIX}_{supplier['name']}"
+
+    def _fetch_supplier(self, supplier):
+        """Возвращает {название панели: цена} одного поставщика (из кеша, если есть)."""
+        cache_key = self._cache_key(supplier)
+        cached_prices = cache.get(cache_key)
+        if cached_prices is not None:
+            return cached_prices
+
+        timeout = min(supplier.get('timeout', self.deadline), self.deadline)
+        response = requests.get(supplier['url'], timeout=timeout)
+        response.raise_for_status()
+
+        prices = {}
+        for item in response.json()['prices']:
+            price = float(item['price'])
+            if price > 0:
+                prices[item['name']] = price
+
+        if self.cache_seconds:
+            cache.set(cache_key, prices, self.cache_seconds)
+        return prices
+
+    def fetch_all(self):
+        """
+        Опрашивает всех поставщиков параллельно с общим дедлайном.
+
+        Возвращает (prices, errors): prices — {поставщик: {панель: цена}} только
+        по ответившим, errors — {поставщик: описание ошибки или таймаута}.
+        """
+        if not self.suppliers:
+            return {}, {}
+
+        executor = ThreadPoolExecutor(max_workers=len(self.suppliers))
+        futures = {executor.submit(self._fetch_supplier, supplier): supplier['name']
+                   for supplier in self.suppliers}
+        done, not_done = wait(futures, timeout=self.deadline)
+        # Не ждём зависших поставщиков: их потоки завершатся по своему таймауту
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        prices, errors = {}, {}
+        for future in done:
+            name = futures[future]
+            try:
+                prices[name] = future.result()
+            except (requests.exceptions.RequestException, KeyError, TypeError, ValueError) as e:
+                errors[name] = str(e)
+        for future in not_done:
+            errors[futures[future]] = f"не ответил за {self.deadline} с"
+
+        for name, error in errors.items():
+            print(f"[Suppliers] {name}: {error}")
+        return prices, errors
+
+    def aggregate(self):
+        """Возвращает ({панель: медианная цена}, errors)."""
+        prices, errors = self.fetch_all()
+
+        offers = {}
+        for supplier_prices in prices.values():
+            for panel_name, price in supplier_prices.items():
+                offers.setdefault(panel_name, []).append(price)
+
+        return {name: median(values) for name, values in offers.items()}, errors
+
+    def update_panel_prices(self, batch_size=500, dry_run=False):
+        """
+        Обновляет SolarPanel.price одним bulk_update по агрегированным ценам.
+
+        С dry_run только считает, сколько цен изменилось бы: без записи в БД,
+        сброса каталога и постановки пересчёта.
+        """
+        from ..models import SolarPanel
+
+        market_prices, errors = self.aggregate()
+        if not market_prices:
+            return {'updated': 0, 'matched': 0, 'errors': errors}
+
+        changed = []
+        panels = SolarPanel.objects.filter(name__in=market_prices.keys()).only('id', 'name', 'price')
+        matched = 0
+        for panel in panels.iterator(chunk_size=batch_size):
+            matched += 1
+            new_price = Decimal(str(market_prices[panel.name])).quantize(Decimal('0.01'))
+            if panel.price != new_price:
+                panel.price = new_price
+                changed.append(panel)
+
+        if changed and not dry_run:
+            SolarPanel.objects.bulk_update(changed, ['price'], batch_size=batch_size)
+            # bulk_update не шлёт сигналы — сбрасываем кеш каталога и
+            # ставим пересчёт затронутых расчётов явно
+            catalog_cache.invalidate()
+            from .jobs import enqueue
+            enqueue('recompute_catalog', {'panel_ids': [panel.pk for panel in changed]})
+
+        return {'updated': 0 if dry_run else len(changed), 'would_change': len(changed),
+                'matched': matched, 'errors': errors}
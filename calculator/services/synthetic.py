@@ -0,0 +1,213 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .calculator import SolarROICalculator
+
+# Префиксы синтетических записей: по ним генератор дозаполняет каталог, не создавая дублей
+REGION_CODE_PREFIX = 'SYN'
+PANEL_NAME_PREFIX = 'SYN '
+USERNAME_PREFIX = 'synthetic_'
+
+MANUFACTURERS = ['SunPower', 'LG', 'JA Solar', 'Canadian Solar', 'Trina Solar', 'REC',
+                 'Longi', 'Jinko Solar', 'Qcells', 'Hyundai', 'Hevel', 'Risen']
+
+# Доля анонимных расчётов (user = NULL)
+ANONYMOUS_SHARE = 0.2
+
+
+def _zipf_weights(count, exponent, rng=None):
+    """Вероятности «длинного хвоста»: несколько популярных объектов и много редких."""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    if rng is not None:
+        rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _sun_hours_for_latitude(latitude):
+    # Как у fallback-модели: чем ближе к экватору, тем больше солнца
+    return np.clip(2600 - 18 * (np.abs(latitude) - 40), 900, 2600)
+
+
+def generate_regions(count, rng, batch_size=1000):
+    """Дозаполняет синтетические регионы до count штук (широты и долготы России)."""
+    from ..models import Region
+
+    existing = Region.objects.filter(code__startswith=REGION_CODE_PREFIX).count()
+    for start in range(existing, count, batch_size):
+        size = min(batch_size, count - start)
+        latitude = rng.uniform(42, 70, size)
+        longitude = rng.uniform(28, 178, size)
+        tariff_day = rng.uniform(3.0, 9.0, size)
+        tariff_night = tariff_day * rng.uniform(0.55, 0.75, size)
+        sun_hours = _sun_hours_for_latitude(latitude) * rng.normal(1, 0.05, size)
+
+        Region.objects.bulk_create([
+            Region(
+                name=f"Синтетический регион {start + i + 1}",
+                code=f"{REGION_CODE_PREFIX}{start + i + 1:05d}",
+                tariff_day=Decimal(f"{tariff_day[i]:.2f}"),
+                tariff_night=Decimal(f"{tariff_night[i]:.2f}"),
+                avg_sun_hours=round(float(sun_hours[i])),
+                latitude=round(float(latitude[i]), 4),
+                longitude=round(float(longitude[i]), 4),
+            )
+            for i in range(size)
+        ], ignore_conflicts=True)
+    return max(0, count - existing)
+
+
+def generate_panels(count, rng, batch_size=1000):
+    """Дозаполняет синтетические панели до count штук (мощность 300–700 Вт, цена ~ мощности)."""
+    from ..models import SolarPanel
+
+    existing = SolarPanel.objects.filter(name__startswith=PANEL_NAME_PREFIX).count()
+    for start in range(existing, count, batch_size):
+        size = min(batch_size, count - start)
+        power_w = rng.integers(6, 15, size) * 50
+        efficiency = rng.uniform(0.18, 0.235, size)
+        price = power_w * rng.uniform(30, 60, size)
+        manufacturers = rng.choice(MANUFACTURERS, size)
+
+        SolarPanel.objects.bulk_create([
+            SolarPanel(
+                name=f"{PANEL_NAME_PREFIX}{manufacturers[i]} {power_w[i]}W #{start + i + 1}",
+                manufacturer=manufacturers[i],
+                power_w=int(power_w[i]),
+                efficiency=round(float(efficiency[i]), 3),
+                price=Decimal(f"{price[i]:.2f}"),
+                dimensions='1722×1134×35',
+                warranty_years=int(rng.choice([12, 15, 20, 25])),
+            )
+            for i in range(size)
+        ])
+    return max(0, count - existing)
+
+
+def generate_users(count, batch_size=1000):
+    """Дозаполняет синтетических пользователей до count штук (общий пароль synthetic)."""
+    from django.contrib.auth.models import User
+
+    existing = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+    password = make_password('synthetic')
+    for start in range(existing, count, batch_size):
+        size = min(batch_size, count - start)
+        User.objects.bulk_create([
+            User(username=f"{USERNAME_PREFIX}{start + i + 1:06d}", password=password)
+            for i in range(size)
+        ], ignore_conflicts=True)
+    return max(0, count - existing)
+
+
+@contextmanager
+def _explicit_timestamps(model):
+    """Отключает auto_now/auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _catalog_arrays():
+    """Каталог в виде массивов numpy (id и параметры, нужные для расчёта)."""
+    from ..models import Region, SolarPanel
+
+    regions = list(Region.objects.values_list('id', 'tariff_day', 'avg_sun_hours'))
+    panels = list(SolarPanel.objects.values_list('id', 'power_w', 'efficiency', 'price'))
+    region_arrays = {
+        'id': np.array([row[0] for row in regions]),
+        'tariff_day': np.array([float(row[1]) for row in regions]),
+        'sun_hours': np.array([row[2] for row in regions], dtype=float),
+    }
+    panel_arrays = {
+        'id': np.array([row[0] for row in panels]),
+        'power_w': np.array([row[1] for row in panels], dtype=float),
+        'efficiency': np.array([row[2] for row in panels], dtype=float),
+        'price': np.array([float(row[3]) for row in panels]),
+    }
+    return region_arrays, panel_arrays
+
+
+def generate_calculations(count, rng, days=730, batch_size=5000, progress=None):
+    """
+    Создаёт count расчётов с правдоподобными распределениями, пакетами по batch_size.
+
+    Пользователи, регионы и панели выбираются с «длинным хвостом», даты — за
+    последние days дней с ростом к текущему моменту, потребление — логнормальное.
+    Результаты считаются той же формулой, что и в SolarROICalculator, по
+    avg_sun_hours региона (без запросов к NASA). В памяти держится один пакет.
+    """
+    from django.contrib.auth.models import User
+    from ..models import Calculation
+
+    regions, panels = _catalog_arrays()
+    if not len(regions['id']) or not len(panels['id']):
+        raise ValueError("Каталог пуст: нет регионов или панелей")
+    user_ids = np.array(User.objects.order_by('pk').values_list('pk', flat=True))
+
+    region_weights = _zipf_weights(len(regions['id']), 0.8, rng)
+    panel_weights = _zipf_weights(len(panels['id']), 1.0, rng)
+    user_weights = _zipf_weights(len(user_ids), 0.9, rng) if len(user_ids) else None
+    now = timezone.now()
+
+    created = 0
+    with _explicit_timestamps(Calculation):
+        while created < count:
+            size = min(batch_size, count - created)
+            region_idx = rng.choice(len(regions['id']), size, p=region_weights)
+            panel_idx = rng.choice(len(panels['id']), size, p=panel_weights)
+            if user_weights is not None:
+                users = rng.choice(user_ids, size, p=user_weights)
+                anonymous = rng.random(size) < ANONYMOUS_SHARE
+            else:
+                users = np.zeros(size, dtype=int)
+                anonymous = np.ones(size, dtype=bool)
+
+            panel_count = np.clip(np.rint(rng.lognormal(np.log(12), 0.45, size)), 1, 100).astype(int)
+            monthly_consumption = np.clip(np.rint(rng.lognormal(np.log(350), 0.5, size)), 50, 5000)
+            # Плотность растёт линейно к текущему моменту (сервис набирает популярность)
+            age_seconds = days * 86400 * (1 - np.sqrt(rng.random(size)))
+
+            total_power_kw = panels['power_w'][panel_idx] * panel_count / 1000
+            production = total_power_kw * regions['sun_hours'][region_idx] * panels['efficiency'][panel_idx]
+            effective = np.minimum(production, monthly_consumption * 12)
+            yearly_saving = effective * regions['tariff_day'][region_idx]
+            system_cost = panels['price'][panel_idx] * panel_count * SolarROICalculator.INSTALLATION_FACTOR
+            payback = np.divide(system_cost, yearly_saving, out=np.zeros(size), where=yearly_saving > 0)
+
+            batch = []
+            for i in range(size):
+                created_at = now - timedelta(seconds=float(age_seconds[i]))
+                batch.append(Calculation(
+                    user_id=None if anonymous[i] else int(users[i]),
+                    region_id=int(regions['id'][region_idx[i]]),
+                    panel_id=int(panels['id'][panel_idx[i]]),
+                    panel_count=int(panel_count[i]),
+                    monthly_consumption=float(monthly_consumption[i]),
+                    total_cost=Decimal(f"{system_cost[i]:.2f}"),
+                    system_power_kw=round(float(total_power_kw[i]), 2),
+                    yearly_production_kwh=round(float(production[i])),
+                    yearly_saving=Decimal(f"{yearly_saving[i]:.2f}"),
+                    payback_years=round(float(payback[i]), 1),
+                    co2_saved_kg=round(float(production[i]) * 0.5),
+                    created_at=created_at,
+                    updated_at=created_at,
+                ))
+
+            with transaction.atomic():
+                Calculation.objects.bulk_create(batch, batch_size=batch_size)
+            created += size
+            if progress is not None:
+                progress(created, count)
+    return created
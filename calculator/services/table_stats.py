@@ -0,0 +1,36 @@
+from django.db import connection
+
+
+def estimate_row_count(model):
+    """
+    Оценка количества строк таблицы по статистике СУБД (без полного COUNT(*)).
+
+    PostgreSQL — pg_class.reltuples, MySQL — information_schema, SQLite —
+    sqlite_stat1 (заполняется командой ANALYZE). Возвращает None, если оценки нет.
+    """
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = %s", [table]
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # Первое число в stat — количество строк таблицы
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        else:
+            return None
+
+        row = cursor.fetchone()
+
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Region, SolarPanel
+from .services.catalog import catalog_cache
+
+# Поля каталога, от которых зависят сохранённые результаты расчётов
+RECOMPUTE_FIELDS = {Region: 'tariff_day', SolarPanel: 'price'}
+
+
+@receiver([post_save, post_delete], sender=Region)
+@receiver([post_save, post_delete], sender=SolarPanel)
+def invalidate_catalog(sender, **kwargs):
+    """Сбрасывает кеш каталога при изменении регионов или панелей (в т.ч. из админки)."""
+    catalog_cache.invalidate()
+
+
+@receiver(pre_save, sender=Region)
+@receiver(pre_save, sender=SolarPanel)
+def remember_recompute_field(sender, instance, raw=False, **kwargs):
+    """Запоминает, изменился ли тариф региона или цена панели (сравнение с БД)."""
+    field = RECOMPUTE_FIELDS[sender]
+    instance._recompute_needed = False
+    if raw or instance.pk is None:
+        return
+    old_value = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._recompute_needed = old_value is not None and old_value != getattr(instance, field)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=SolarPanel)
+def schedule_recompute(sender, instance, created=False, **kwargs):
+    """Ставит в очередь пересчёт расчётов, затронутых сменой тарифа или цены."""
+    if created or not getattr(instance, '_recompute_needed', False):
+        return
+    from .services.jobs import enqueue
+
+    key = 'region_ids' if sender is Region else 'panel_ids'
+    transaction.on_commit(lambda: enqueue('recompute_catalog', {key: [instance.pk]}))
@@ -0,0 +1,75 @@
+"""Обработчики фоновых задач (выполняются командой runworker)."""
+from .api import calculate_api_item
+from .services.jobs import register_job
+
+# Максимальное количество расчётов в одной задаче calculate_batch
+JOB_MAX_BATCH_SIZE = 10000
+
+
+def validate_calculate_batch(params):
+    items = params.get('items')
+    if not isinstance(items, list):
+        return {'items': ['Ожидается список расчётов']}
+    if len(items) > JOB_MAX_BATCH_SIZE:
+        return {'items': [f'Не более {JOB_MAX_BATCH_SIZE} расчётов в одной задаче']}
+    return None
+
+
+@register_job('calculate_batch', validate=validate_calculate_batch)
+def calculate_batch(params, progress):
+    """Пакетный расчёт: params = {"items": [...]} в формате JSON API."""
+    # Задачу могли поставить в очередь в обход API — проверяем и здесь
+    errors = validate_calculate_batch(params)
+    if errors:
+        raise ValueError('; '.join(errors['items']))
+    items = params['items']
+    results = []
+
+    for index, item in enumerate(items):
+        result, errors = calculate_api_item(item)
+        if errors:
+            results.append({'index': index, 'errors': errors})
+        else:
+            results.append({'index': index, 'result': result})
+
+        # Пишем прогресс не чаще, чем раз в 1% задачи
+        if (index + 1) % max(1, len(items) // 100) == 0:
+            progress((index + 1) / len(items))
+
+    return {'results': results}
+
+
+@register_job('update_prices', staff_only=True)
+def update_prices(params, progress):
+    """Обновление цен панелей по API поставщиков."""
+    from .services.suppliers import SupplierPriceAggregator
+
+    return SupplierPriceAggregator(deadline=params.get('deadline')).update_panel_prices()
+
+
+@register_job('recompute_catalog', staff_only=True)
+def recompute_catalog(params, progress):
+    """Пересчёт сохранённых расчётов после смены тарифов регионов или цен панелей."""
+    from .services.recompute import recompute_for_catalog_change
+
+    return recompute_for_catalog_change(
+        region_ids=params.get('region_ids') or [],
+        panel_ids=params.get('panel_ids') or [],
+        progress=progress,
+    )
+
+
+@register_job('recompute_calculations', staff_only=True)
+def recompute_calculations(params, progress):
+    """Полный пересчёт расчётов, выбранных в админке (по ids или фильтрам списка)."""
+    from .services.recompute import calculations_for_params, recompute_calculations as recompute
+
+    return recompute(calculations_for_params(params), progress=progress)
+
+
+@register_job('build_heatmap', staff_only=True)
+def build_heatmap(params, progress):
+    """Перестроение тайлов карты окупаемости."""
+    from .services.heatmap import build_heatmap as build
+
+    return build(allow_fallback=bool(params.get('allow_fallback')))
@@ -10,4 +10,12 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
+    path('api/calculate/', views.api_calculate, name='api_calculate'),
+    path('api/calculate/batch/', views.api_calculate_batch, name='api_calculate_batch'),
+    path('api/jobs/', views.api_job_create, name='api_job_create'),
+    path('api/jobs/stats/', views.api_job_stats, name='api_job_stats'),
+    path('api/jobs/<uuid:job_id>/', views.api_job_status, name='api_job_status'),
+    path('api/jobs/<uuid:job_id>/result/', views.api_job_result, name='api_job_result'),
+    path('api/heatmap/', views.api_heatmap, name='api_heatmap'),
+    path('api/heatmap/tiles/<int:tile_y>/<int:tile_x>/', views.api_heatmap_tile, name='api_heatmap_tile'),
 ]
\ No newline at end of file
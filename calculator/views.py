@@ -1,36 +1,56 @@
-from django.shortcuts import render, redirect
+import json
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
 from django.contrib import messages
-from django.db.models import Count, Avg, Sum
-from .models import Calculation, SolarPanel, Region
+from .models import Calculation, Job
 from .services.calculator import SolarROICalculator
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm
 from django.shortcuts import render, redirect
+from .api import calculate_api_item, item_cost
+from .decorators import admission_control
+from .services.admission import AdmissionRejected, fail_fast
+from .services.heatmap import load_meta, load_tile
+from .services.jobs import enqueue, get_job_kind, queue_stats
+from .services.profiling import list_profiles, profile_path, profiling_settings
+from .services.statistics import site_statistics, user_statistics
 from .forms import UserRegistrationForm, SolarCalculationForm
 
+# Максимальное количество расчётов в одном batch-запросе API
+API_MAX_BATCH_SIZE = 1000
+
+# Компактный JSON без пробелов (меньше байт, лучше сжимается gzip)
+API_JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+# Тайлы карты неизменны в пределах версии — кешируем их в браузере и CDN
+HEATMAP_TILE_MAX_AGE = 60 * 60 * 24
+
 
 def home(request):
     """Главная страница со статистикой."""
-    total_calculations = Calculation.objects.count()
-    avg_payback = Calculation.objects.aggregate(Avg('payback_years'))
-    total_co2_saved = Calculation.objects.aggregate(Sum('co2_saved_kg'))
-
-    # Самые популярные панели
-    popular_panels = SolarPanel.objects.annotate(
-        calc_count=Count('calculation')
-    ).order_by('-calc_count')[:5]
+    stats = site_statistics()
 
     context = {
-        'total_calculations': total_calculations,
-        'avg_payback': round(avg_payback['payback_years__avg'] or 0, 1),
-        'total_co2_saved': total_co2_saved['co2_saved_kg__sum'] or 0,
-        'popular_panels': popular_panels,
+        'total_calculations': stats['total_calculations'],
+        'avg_payback': round(stats['avg_payback'] or 0, 1),
+        'total_co2_saved': stats['total_co2_saved'],
+        'popular_panels': stats['popular_panels'],
         'title': 'Solar ROI Calculator'
     }
     return render(request, 'calculator/home.html', context)
 
 
+@admission_control('calculate', as_json=False)
 def calculate(request):
     """Страница расчёта окупаемости."""
     result = None
@@ -51,6 +71,8 @@ def calculate(request):
             )
 
             result = calculator.calculate()
+            if form.cleaned_data.get('battery'):
+                result['battery'] = calculator.calculate_battery()
 
             if request.user.is_authenticated:
                 calculation = Calculation.objects.create(
@@ -74,6 +96,12 @@ def calculate(request):
                 'result': result,
                 'title': 'Результаты расчёта'
             }
+            if 'battery' in result:
+                battery = result['battery']
+                context['battery_curve'] = zip(
+                    battery['capacities_kwh'], battery['yearly_saving'],
+                    battery['payback_years'], battery['self_consumption_percentage'],
+                )
             return render(request, 'calculator/calculate.html', context)
     else:
         form = SolarCalculationForm()
@@ -88,14 +116,12 @@ def calculate(request):
 @login_required
 def history(request):
     """История расчётов для авторизованных пользователей."""
-    calculations = Calculation.objects.filter(user=request.user).order_by('-created_at')
+    calculations = Calculation.objects.filter(user=request.user).select_related(
+        'region', 'panel'
+    ).order_by('-created_at')
 
-    # Агрегация по истории (сложный ORM-запрос)
-    stats = calculations.aggregate(
-        total_investment=Sum('total_cost'),
-        total_saving_per_year=Sum('yearly_saving'),
-        avg_payback=Avg('payback_years')
-    )
+    # Агрегация по истории: текущие расчёты + агрегаты архива
+    stats = user_statistics(request.user)
 
     context = {
         'calculations': calculations,
@@ -157,6 +183,256 @@ def user_login(request):
     return render(request, 'calculator/login.html', context)
 
 
+def _api_load_json(request):
+    try:
+        return json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _api_error(errors, status=400):
+    return JsonResponse({'errors': errors}, status=status, json_dumps_params=API_JSON_PARAMS)
+
+
+@csrf_exempt
+@require_POST
+@admission_control('api')
+def api_calculate(request):
+    """JSON API: один расчёт окупаемости без графика и HTML."""
+    payload = _api_load_json(request)
+    if payload is None:
+        return _api_error({'__all__': ['Некорректный JSON']})
+
+    result, errors = calculate_api_item(payload)
+    if errors:
+        return _api_error(errors)
+    return JsonResponse(result, json_dumps_params=API_JSON_PARAMS)
+
+
+def _batch_cost(request):
+    """Стоимость пакета для контроля допуска: сумма item_cost по элементам."""
+    payload = _api_load_json(request)
+    items = payload.get('items') if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return 1
+    return max(1, sum(item_cost(item) for item in items))
+
+
+@csrf_exempt
+@require_POST
+@admission_control('api_batch', cost=_batch_cost,
+                   too_heavy_hint='Поставьте пакет в очередь: POST /api/jobs/ {"kind": "calculate_batch"}')
+@gzip_page
+def api_calculate_batch(request):
+    """
+    JSON API: пакетный расчёт.
+
+    Тело запроса: {"items": [{...}, ...]}. Ответ — {"results": [...]}, где каждый
+    элемент содержит либо "result", либо "errors". С параметром ?format=ndjson
+    (или Accept: application/x-ndjson) результаты отдаются потоком, по строке на элемент.
+    """
+    payload = _api_load_json(request)
+    items = payload.get('items') if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return _api_error({'items': ['Ожидается список расчётов']})
+    if len(items) > API_MAX_BATCH_SIZE:
+        return _api_error({'items': [f'Не более {API_MAX_BATCH_SIZE} расчётов в одном запросе']})
+
+    def iter_results():
+        for index, item in enumerate(items):
+            result, errors = calculate_api_item(item)
+            if errors:
+                yield {'index': index, 'errors': errors}
+            else:
+                yield {'index': index, 'result': result}
+
+    wants_ndjson = (
+        request.GET.get('format') == 'ndjson'
+        or 'application/x-ndjson' in request.headers.get('Accept', '')
+    )
+    if wants_ndjson:
+        def iter_lines():
+            # Генератор выполняется уже после выхода из admission_control — отказ
+            # этапа становится последней строкой потока (статус 200 уже отправлен)
+            try:
+                with fail_fast():
+                    for row in iter_results():
+                        yield json.dumps(row, **API_JSON_PARAMS) + '\n'
+            except AdmissionRejected as e:
+                yield json.dumps({'errors': {'__all__': [e.reason]}, 'retry_after': e.retry_after},
+                                 **API_JSON_PARAMS) + '\n'
+
+        return StreamingHttpResponse(iter_lines(), content_type='application/x-ndjson')
+
+    return JsonResponse({'results': list(iter_results())}, json_dumps_params=API_JSON_PARAMS)
+
+
+def _csrf_failure(request):
+    """
+    CSRF-проверка для вошедших пользователей в csrf_exempt API.
+
+    Анонимным клиентам API токен не нужен, но запрос с сессионной кукой
+    должен нести CSRF-токен, иначе чужой сайт сможет действовать от имени
+    пользователя (в том числе администратора). Возвращает ответ 403 или None.
+    """
+    if not request.user.is_authenticated:
+        return None
+    return CsrfViewMiddleware(lambda req: None).process_view(request, None, (), {})
+
+
+def _job_for_request(request, job_id):
+    """Задача доступна владельцу, персоналу или всем, если создана анонимно (id — UUID)."""
+    job = get_object_or_404(Job, pk=job_id)
+    if job.user_id and job.user_id != request.user.id and not request.user.is_staff:
+        return None
+    return job
+
+
+@csrf_exempt
+@require_POST
+@admission_control('api_jobs')
+def api_job_create(request):
+    """Ставит тяжёлую задачу в очередь: {"kind": "calculate_batch", "params": {...}}."""
+    if _csrf_failure(request) is not None:
+        return _api_error({'__all__': ['Ошибка проверки CSRF: передайте заголовок X-CSRFToken']}, status=403)
+
+    payload = _api_load_json(request)
+    if not isinstance(payload, dict):
+        return _api_error({'__all__': ['Некорректный JSON']})
+
+    kind = payload.get('kind')
+    job_kind = get_job_kind(kind) if isinstance(kind, str) else None
+    if job_kind is None:
+        return _api_error({'kind': [f'Неизвестный тип задачи: {kind}']})
+    if job_kind['staff_only'] and not request.user.is_staff:
+        return _api_error({'kind': ['Задача доступна только администраторам']}, status=403)
+
+    params = payload.get('params') or {}
+    if not isinstance(params, dict):
+        return _api_error({'params': ['Ожидается JSON-объект']})
+    if job_kind['validate']:
+        errors = job_kind['validate'](params)
+        if errors:
+            return _api_error(errors)
+
+    user = request.user if request.user.is_authenticated else None
+    job = enqueue(kind, params, user=user)
+    return JsonResponse(
+        {'id': str(job.pk), 'status': job.status, 'url': reverse('calculator:api_job_status', args=[job.pk])},
+        status=202, json_dumps_params=API_JSON_PARAMS
+    )
+
+
+@require_GET
+def api_job_status(request, job_id):
+    """Статус и прогресс задачи (для опроса клиентом)."""
+    job = _job_for_request(request, job_id)
+    if job is None:
+        return _api_error({'__all__': ['Нет доступа к задаче']}, status=403)
+
+    return JsonResponse({
+        'id': str(job.pk),
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }, json_dumps_params=API_JSON_PARAMS)
+
+
+@require_GET
+@gzip_page
+def api_job_result(request, job_id):
+    """Результат завершённой задачи; 409, пока задача не готова."""
+    job = _job_for_request(request, job_id)
+    if job is None:
+        return _api_error({'__all__': ['Нет доступа к задаче']}, status=403)
+    if job.status != Job.STATUS_DONE:
+        return _api_error({'status': [job.status]}, status=409)
+    return JsonResponse(job.result, safe=False, json_dumps_params=API_JSON_PARAMS)
+
+
+@require_GET
+def api_job_stats(request):
+    """Наблюдаемость очереди: глубина, возраст старейшей задачи, среднее ожидание и время выполнения."""
+    if not request.user.is_staff:
+        return _api_error({'__all__': ['Доступно только администраторам']}, status=403)
+    return JsonResponse(queue_stats(), json_dumps_params=API_JSON_PARAMS)
+
+
+@require_GET
+def api_heatmap(request):
+    """Метаданные карты окупаемости: сетка, размер тайлов, эталонная система, шаблон URL тайлов."""
+    meta = load_meta()
+    if meta is None:
+        return _api_error({'__all__': ['Карта ещё не построена (manage.py build_heatmap)']}, status=404)
+    tile_url = reverse('calculator:api_heatmap_tile', args=[0, 0]).replace('/0/0/', '/{y}/{x}/')
+    return JsonResponse(dict(meta, tile_url=tile_url), json_dumps_params=API_JSON_PARAMS)
+
+
+def _heatmap_tile_etag(request, tile_y, tile_x):
+    meta = load_meta()
+    return f"{meta['version']}-{tile_y}-{tile_x}" if meta else None
+
+
+@require_GET
+@condition(etag_func=_heatmap_tile_etag)
+@gzip_page
+def api_heatmap_tile(request, tile_y, tile_x):
+    """
+    Тайл карты окупаемости: values — строки сетки с севера на юг (None — нет данных).
+
+    Тайлы заранее рассчитаны командой build_heatmap, здесь только чтение
+    готового массива; ответ кешируется по версии карты.
+    """
+    meta = load_meta()
+    if meta is None:
+        return _api_error({'__all__': ['Карта ещё не построена (manage.py build_heatmap)']}, status=404)
+
+    cache_key = f"heatmap_tile_{meta['version']}_{tile_y}_{tile_x}"
+    body = cache.get(cache_key)
+    if body is None:
+        values = load_tile(tile_y, tile_x)
+        if values is None:
+            return _api_error({'__all__': ['Нет такого тайла']}, status=404)
+        size = meta['tile_size']
+        body = json.dumps({
+            'tile_y': tile_y,
+            'tile_x': tile_x,
+            'lat_max': meta['lat_max'] - tile_y * size * meta['step'],
+            'lon_min': meta['lon_min'] + tile_x * size * meta['step'],
+            'step': meta['step'],
+            'values': values,
+        }, **API_JSON_PARAMS)
+        cache.set(cache_key, body, HEATMAP_TILE_MAX_AGE)
+
+    response = HttpResponse(body, content_type='application/json')
+    patch_cache_control(response, public=True, max_age=HEATMAP_TILE_MAX_AGE)
+    return response
+
+
+@staff_member_required
+def admin_profiles(request):
+    """Админ-страница: самые медленные профилированные запросы."""
+    context = {
+        'profiles': list_profiles(),
+        'profiling': profiling_settings(),
+        'title': 'Профили запросов',
+    }
+    return render(request, 'calculator/profiles.html', context)
+
+
+@staff_member_required
+def admin_profile_download(request, profile_id, kind):
+    """Скачивание профиля: folded-стеки для flamegraph или JSON с SQL-статистикой."""
+    path = profile_path(profile_id, '.folded' if kind == 'folded' else '.json')
+    if path is None:
+        raise Http404("Профиль не найден")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+
 def user_logout(request):
     """Выход из системы."""
     from django.contrib.auth import logout
@@ -46,6 +46,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'calculator.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,6 +78,22 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Держим соединение между запросами вместо открытия на каждый запрос
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # WAL: чтение не блокируется записью; synchronous=NORMAL безопасен в режиме WAL
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA busy_timeout=5000;'
+                'PRAGMA temp_store=MEMORY;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA mmap_size=134217728;'
+            ),
+            # Запись сразу берёт блокировку: без ошибок "database is locked" при апгрейде транзакции
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
@@ -123,8 +140,78 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    # Общий для всех процессов узла кеш контроля допуска (ADMISSION['CACHE']).
+    # На нагруженном узле лучше memcached/redis на localhost, например
+    # {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': '127.0.0.1:11211'}
+    'admission': {
+        'BACKEND': 'calculator.cache.LockedFileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'admission',
+        # Вытеснение при переполнении сбрасывало бы корзины и аренды слотов
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
 NASA_API_TIMEOUT = 30
-NASA_API_CACHE_HOURS = 24
\ No newline at end of file
+NASA_API_CACHE_HOURS = 24
+
+# Многолетний архив NASA POWER (manage.py fetch_climatology).
+# 0 — считать по последним 365 дням, N — по типичному году за N лет
+NASA_CLIMATOLOGY_YEARS = 0
+CLIMATOLOGY_DIR = BASE_DIR / 'climatology'
+
+# API поставщиков для агрегации цен (manage.py update_prices).
+# Пример: {'name': 'supplier-a', 'url': 'https://supplier-a.example/api/prices', 'timeout': 3}
+PRICE_SUPPLIERS = []
+PRICE_SUPPLIER_DEADLINE = 5
+PRICE_CACHE_SECONDS = 60 * 60
+
+# Контроль допуска (calculator.decorators.admission_control): корзины токенов по
+# клиентам и лимит одновременных дорогих этапов на все процессы. Корзины и
+# аренды слотов хранятся в общем кеше узла CACHES['admission'].
+ADMISSION = {
+    'ENABLED': True,
+    'CACHE': 'admission',
+    'RATES': {
+        'calculate': (1.0, 10),
+        'api': (5.0, 50),
+        # В единицах стоимости элементов (calculator.api.item_cost), а не запросов
+        'api_batch': (20.0, 2000),
+        'api_jobs': (0.5, 5),
+    },
+    # Партнёрские интеграции со своими лимитами, например
+    # {'user_42': {'api': (2000.0, 4000), 'api_batch': (5000.0, 20000)}, 'ip_10.0.0.5': {'api': None}}
+    'CLIENT_RATES': {},
+    'STAGE_LIMITS': {
+        'render': 4,
+        'upstream': 8,
+    },
+}
+
+# Карта окупаемости (manage.py build_heatmap, /api/heatmap/).
+# Переопределяются сетка (LAT_RANGE, LON_RANGE, STEP, TILE_SIZE) и эталонная система
+HEATMAP = {
+    'STEP': 0.5,
+    'DIR': BASE_DIR / 'heatmap',
+}
+
+# Фоновые задачи (manage.py runworker): через сколько секунд задача в running
+# считается зависшей и возвращается в очередь (при старте воркера и каждые
+# JOB_STALE_CHECK_SECONDS в его цикле)
+JOB_STALE_SECONDS = 60 * 60
+JOB_STALE_CHECK_SECONDS = 60
+
+# Расчёты старше этого срока переносятся в архив (manage.py archive_calculations)
+CALCULATION_RETENTION_DAYS = 365
+
+# Профилирование запросов (calculator.middleware.ProfilingMiddleware).
+# Профили: админка -> /admin/profiles/
+PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'HEADER': 'X-Profile',
+    'DIR': BASE_DIR / 'profiles',
+}
+
+# Как часто процесс сверяет закешированный каталог с версией в БД, с
+CATALOG_CHECK_SECONDS = 5
@@ -16,8 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from calculator import views as calculator_views
 
 urlpatterns = [
+    # Профили запросов (до admin.site.urls, иначе перехватит админка)
+    path('admin/profiles/', calculator_views.admin_profiles, name='admin_profiles'),
+    path('admin/profiles/<str:profile_id>/<str:kind>/', calculator_views.admin_profile_download,
+         name='admin_profile_download'),
     path('admin/', admin.site.urls),
     path('', include('calculator.urls')),
 ]